@@ -0,0 +1,81 @@
+"""Benchmark: recursive vs iterative flatten_json, and streaming flatten_jsonl on a large file.
+
+Writes a synthetic JSONL file of the requested size (in MB) to a temporary
+directory; pass 1024 for the 1 GB run.
+
+Usage:
+    python benchmarks/bench_json_flatten.py [size_mb]
+"""
+
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+from devkit.data.json_utils import flatten_json, flatten_jsonl
+
+
+def _recursive_flatten(data: dict, separator: str = ".", prefix: str = "") -> dict:
+    """The previous flatten_json: one recursive call and dict per nested object."""
+    result = {}
+    for key, value in data.items():
+        new_key = f"{prefix}{separator}{key}" if prefix else key
+        if isinstance(value, dict):
+            result.update(_recursive_flatten(value, separator, new_key))
+        else:
+            result[new_key] = value
+    return result
+
+
+def _make_record(rng: random.Random, i: int) -> dict:
+    return {
+        "id": i,
+        "user": {"name": f"user{i}", "profile": {"age": rng.randint(18, 90), "tags": ["a", "b"][: rng.randint(0, 2)]}},
+        "event": {"type": rng.choice(["click", "view", "buy"]), "meta": {"page": {"path": "/p/42", "ref": None}}},
+        "metrics": {"latency_ms": rng.random() * 100, "bytes": rng.randint(0, 1 << 20)},
+    }
+
+
+def _write_corpus(path: str, size_mb: int) -> int:
+    rng = random.Random(0)
+    target = size_mb * 1024 * 1024
+    written = n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            line = json.dumps(_make_record(rng, n)) + "\n"
+            f.write(line)
+            written += len(line)
+            n += 1
+    return n
+
+
+def main() -> None:
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    with tempfile.TemporaryDirectory() as tmp:
+        src, dst = os.path.join(tmp, "in.jsonl"), os.path.join(tmp, "out.jsonl")
+        n = _write_corpus(src, size_mb)
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        flatten_jsonl(src, dst)
+        elapsed = time.perf_counter() - start
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"flatten_jsonl: {size_mb} MB, {n} records in {elapsed:.1f}s "
+              f"({size_mb / elapsed:.1f} MB/s), peak RSS growth {(rss_after - rss_before) / 1024:.1f} MB")
+
+    rng = random.Random(1)
+    records = [_make_record(rng, i) for i in range(100_000)]
+    timings = {}
+    for label, func in (("recursive", _recursive_flatten), ("iterative", flatten_json)):
+        start = time.perf_counter()
+        results = [func(r) for r in records]
+        timings[label] = time.perf_counter() - start
+    assert results == [_recursive_flatten(r) for r in records]
+    for label, elapsed in timings.items():
+        print(f"{label:<10} {elapsed / len(records) * 1e6:6.2f} us/record  ({timings['recursive'] / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
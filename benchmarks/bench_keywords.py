@@ -0,0 +1,67 @@
+"""Benchmark: cost of extract_keywords mode='filter' relative to mode='all'.
+
+Usage:
+    python benchmarks/bench_keywords.py [repeats]
+"""
+
+import random
+import sys
+import time
+
+from devkit.text.keywords import _drop_overlapping, extract_keywords, init_jieba
+
+_WORDS = [
+    "自然语言", "语言", "自然语言处理", "处理", "人工智能", "智能", "机器学习", "学习", "深度学习",
+    "神经网络", "网络", "数据", "大数据", "数据挖掘", "模型", "语言模型", "大语言模型", "训练",
+    "推理", "算法", "优化", "计算机", "计算机视觉", "视觉", "图像", "图像识别", "识别", "语音",
+]
+
+
+def _make_text(n_sentences: int) -> str:
+    rng = random.Random(0)
+    sentences = []
+    for _ in range(n_sentences):
+        sentences.append("的".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 8))) + "。")
+    return "".join(sentences)
+
+
+def _pairwise(ranked, top_k):
+    kept = []
+    for word, weight in ranked:
+        if len(kept) < top_k and not any(word in k or k in word for k, _ in kept):
+            kept.append((word, weight))
+    return kept
+
+
+def _best_of(repeats: int, func) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    init_jieba()
+    text = _make_text(2000)
+    print(f"input: {len(text):,} chars")
+    for top_k in (10, 100, 500):
+        plain = _best_of(repeats, lambda: extract_keywords(text, mode="all", top_k=top_k))
+        filtered = _best_of(repeats, lambda: extract_keywords(text, mode="filter", top_k=top_k))
+        print(f"top_k={top_k:<4} all {plain * 1000:8.1f} ms  filter {filtered * 1000:8.1f} ms  "
+              f"({filtered / plain:.2f}x)")
+
+    rng = random.Random(1)
+    ranked = list({"".join(rng.choice("abcdefgh") for _ in range(rng.randint(2, 6))): None for _ in range(5000)})
+    ranked = [(w, float(-i)) for i, w in enumerate(ranked)]
+    for top_k in (100, 500, 2000):
+        fast = _best_of(repeats, lambda: _drop_overlapping(ranked, top_k))
+        slow = _best_of(repeats, lambda: _pairwise(ranked, top_k))
+        print(f"overlap removal over {len(ranked)} candidates, top_k={top_k:<5} "
+              f"substring sets {fast * 1000:7.1f} ms  pairwise {slow * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
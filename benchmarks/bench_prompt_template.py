@@ -0,0 +1,58 @@
+"""Benchmark: renders/sec of prompt templates, re-parsed per call vs compiled and cached.
+
+Usage:
+    python benchmarks/bench_prompt_template.py [n_renders]
+"""
+
+import sys
+import time
+
+from devkit.ai.prompt_template import compile_template, render_template
+
+_TEMPLATES = {
+    "jinja2": (
+        "You are a {{ role }}.\n{% for doc in docs %}[{{ loop.index }}] {{ doc }}\n{% endfor %}"
+        "Answer the question: {{ question }}"
+    ),
+    "format": "You are a {role}.\nContext: {context}\nAnswer the question: {question}",
+}
+_VARIABLES = {
+    "role": "helpful support agent",
+    "docs": ["Refunds take 5 days.", "Exports are limited to 10k rows."],
+    "context": "Refunds take 5 days.",
+    "question": "How long do refunds take?",
+}
+
+
+def _reparsed_render(template: str, variables: dict) -> str:
+    """The previous render_template: build a new jinja2.Template on every call."""
+    if "{%" in template or "{{" in template:
+        from jinja2 import Template
+        return Template(template).render(**variables)
+    return template.format(**variables)
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    print(f"renders: {n}")
+    for kind, template in _TEMPLATES.items():
+        compiled = compile_template(template)
+        timings = {}
+        outputs = {}
+        for label, func in (
+            ("re-parsed", lambda: _reparsed_render(template, _VARIABLES)),
+            ("render_template", lambda: render_template(template, _VARIABLES)),
+            ("compiled.render", lambda: compiled.render(_VARIABLES)),
+        ):
+            start = time.perf_counter()
+            for _ in range(n):
+                out = func()
+            timings[label] = time.perf_counter() - start
+            outputs[label] = out
+        assert len(set(outputs.values())) == 1
+        for label, elapsed in timings.items():
+            print(f"{kind:<7} {label:<16} {n / elapsed:12,.0f} renders/s  ({timings['re-parsed'] / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Benchmark: split_sentence throughput on synthetic Chinese text.
+
+Usage:
+    python benchmarks/bench_split_sentence.py [megabytes]
+"""
+
+import random
+import sys
+import time
+
+from devkit.text.split_sentence import split_sentence
+
+_CLAUSES = [
+    "今天天气很好", "我们去公园散步吧", "他说：“明天见。”", "这是一个很长的句子，里面有很多逗号，还有分号；",
+    "你知道吗？", "太好了！", "‘引用’的内容", "第三章\n", "省略号……", "数字123和English混排",
+]
+_ENDINGS = ["。", "！", "？", "，", "；", "\n", ""]
+
+
+def _make_text(megabytes: float) -> str:
+    rng = random.Random(0)
+    target = int(megabytes * 1024 * 1024)
+    parts = []
+    size = 0
+    while size < target:
+        part = rng.choice(_CLAUSES) + rng.choice(_ENDINGS)
+        parts.append(part)
+        size += len(part.encode("utf-8"))
+    return "".join(parts)
+
+
+def main() -> None:
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 100.0
+    text = _make_text(megabytes)
+    print(f"input: {megabytes:g} MB UTF-8, {len(text):,} chars")
+    for criterion in ("coarse", "fine"):
+        for offsets in (False, True):
+            start = time.perf_counter()
+            result = split_sentence(text, criterion=criterion, return_offsets=offsets)
+            elapsed = time.perf_counter() - start
+            label = "offsets" if offsets else "strings"
+            print(f"{criterion:<6} {label:<7} {len(result):>10,} sentences  "
+                  f"{elapsed:7.2f}s  {megabytes / elapsed:6.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Benchmark: scalar vs batch information-weighted text length.
+
+Usage:
+    python benchmarks/bench_text_length.py [n_texts]
+"""
+
+import random
+import sys
+import time
+
+from devkit.text.text_length import calculate_custom_length, calculate_custom_length_batch
+
+_SAMPLES = [
+    "Hello world, this is a short chat message.",
+    "你好，今天天气怎么样？我们下午三点在公园见面吧。",
+    "Order #A1234 shipped on 2024-05-01 😀 tracking: 1Z999AA10123456784",
+    "混合 mixed 文本 with English words 和中文字符 123。",
+    "ｱｲｳｴｵ カタカナ と ひらがな の テキスト",
+]
+
+
+def _make_texts(n: int) -> list:
+    rng = random.Random(0)
+    return [" ".join(rng.choice(_SAMPLES) for _ in range(rng.randint(1, 4))) for _ in range(n)]
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    texts = _make_texts(n)
+    calculate_custom_length_batch(texts[:1])  # build the lookup table outside the timing
+
+    start = time.perf_counter()
+    scalar = [calculate_custom_length(t) for t in texts]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = calculate_custom_length_batch(texts)
+    batch_time = time.perf_counter() - start
+
+    assert list(batch) == scalar
+    print(f"texts:  {n}")
+    print(f"scalar: {scalar_time:.3f}s ({n / scalar_time:,.0f} texts/s)")
+    print(f"batch:  {batch_time:.3f}s ({n / batch_time:,.0f} texts/s)")
+    print(f"speedup: {scalar_time / batch_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Calibrate and report the error of approx_tokens against tiktoken.
+
+Fits the per-encoding coefficients of devkit.ai.token_counter.approx_tokens
+by relative-error least squares on a JSONL corpus of {"text": ...} records
+(default: the bundled benchmarks/data/token_sample.jsonl), then prints the
+error of the shipped and the refitted coefficients, the held-out error of
+refitting (5-fold cross-validation), and the speed of both counters. Needs
+tiktoken and its BPE files.
+
+Usage:
+    python benchmarks/calibrate_token_approx.py [corpus.jsonl]
+"""
+
+import json
+import os
+import sys
+import time
+
+from devkit.ai.token_counter import _APPROX_COEFFICIENTS, _get_encoding, approx_feature_vector
+
+_DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "token_sample.jsonl")
+_RIDGE = 1e-3
+_FOLDS = 5
+
+
+def _solve(matrix, vector):
+    """Solve a small dense linear system by Gaussian elimination with pivoting."""
+    n = len(vector)
+    rows = [list(matrix[i]) + [vector[i]] for i in range(n)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(n):
+            if r != col and rows[col][col]:
+                factor = rows[r][col] / rows[col][col]
+                rows[r] = [a - factor * b for a, b in zip(rows[r], rows[col])]
+    return [rows[i][n] / rows[i][i] if rows[i][i] else 0.0 for i in range(n)]
+
+
+def _fit(features, exact):
+    """Least squares on relative error, with a small ridge toward zero."""
+    n = len(features[0])
+    gram = [[_RIDGE * (i == j) for j in range(n)] for i in range(n)]
+    rhs = [0.0] * n
+    for x, y in zip(features, exact):
+        weight = 1.0 / max(y, 1) ** 2
+        for i in range(n):
+            rhs[i] += weight * x[i] * y
+            for j in range(n):
+                gram[i][j] += weight * x[i] * x[j]
+    return _solve(gram, rhs)
+
+
+def _relative_errors(coefficients, features, exact):
+    relative = []
+    for x, y in zip(features, exact):
+        estimate = max(1, int(sum(c * f for c, f in zip(coefficients, x)) + 0.5))
+        relative.append(abs(estimate - y) / max(y, 1))
+    return relative
+
+
+def _summary(relative):
+    relative = sorted(relative)
+    return sum(relative) / len(relative), relative[int(0.9 * (len(relative) - 1))], relative[-1]
+
+
+def _errors(coefficients, features, exact):
+    return _summary(_relative_errors(coefficients, features, exact))
+
+
+def _held_out_errors(features, exact):
+    """Error of each text under coefficients fitted without it (k-fold)."""
+    relative = []
+    for fold in range(_FOLDS):
+        train = [i for i in range(len(features)) if i % _FOLDS != fold]
+        test = [i for i in range(len(features)) if i % _FOLDS == fold]
+        coefficients = _fit([features[i] for i in train], [exact[i] for i in train])
+        relative += _relative_errors(coefficients, [features[i] for i in test], [exact[i] for i in test])
+    return _summary(relative)
+
+
+def main() -> None:
+    corpus = sys.argv[1] if len(sys.argv) > 1 else _DEFAULT_CORPUS
+    with open(corpus, "r", encoding="utf-8") as f:
+        texts = [json.loads(line)["text"] for line in f if line.strip()]
+    features = [approx_feature_vector(t) for t in texts]
+    print(f"corpus: {corpus} ({len(texts)} texts)")
+
+    for encoding_name, shipped in _APPROX_COEFFICIENTS.items():
+        enc = _get_encoding(encoding_name)
+        exact = [len(enc.encode(t)) for t in texts]
+        fitted = _fit(features, exact)
+        print(f"\n{encoding_name}")
+        for label, coefficients in (("shipped", shipped), ("refitted", fitted)):
+            mean, p90, worst = _errors(coefficients, features, exact)
+            print(f"  {label:<9} mean {mean:6.1%}  p90 {p90:6.1%}  max {worst:6.1%}")
+        mean, p90, worst = _held_out_errors(features, exact)
+        print(f"  {'held-out':<9} mean {mean:6.1%}  p90 {p90:6.1%}  max {worst:6.1%}  ({_FOLDS}-fold refit)")
+        print(f"  refitted coefficients: ({', '.join(f'{c:.3f}' for c in fitted)})")
+
+        repeated = texts * max(1, 20000 // len(texts))
+        start = time.perf_counter()
+        for t in repeated:
+            len(enc.encode(t))
+        exact_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for t in repeated:
+            sum(c * f for c, f in zip(shipped, approx_feature_vector(t)))
+        approx_time = time.perf_counter() - start
+        print(f"  speed: exact {exact_time / len(repeated) * 1e6:.1f} us/text, "
+              f"approx {approx_time / len(repeated) * 1e6:.1f} us/text ({exact_time / approx_time:.1f}x)")
+
+        bulk = "\n".join(repeated)
+        start = time.perf_counter()
+        enc.encode(bulk)
+        exact_time = time.perf_counter() - start
+        start = time.perf_counter()
+        approx_feature_vector(bulk)
+        approx_time = time.perf_counter() - start
+        print(f"  bulk:  exact {len(bulk) / exact_time / 1e6:.1f} Mchars/s, "
+              f"approx {len(bulk) / approx_time / 1e6:.1f} Mchars/s ({exact_time / approx_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
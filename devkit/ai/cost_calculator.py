@@ -1,6 +1,10 @@
 """LLM API cost estimator."""
 
-from typing import Dict, List, Optional
+import csv
+import json
+from array import array
+from itertools import repeat
+from typing import Dict, List, Optional, Sequence, Union
 
 PRICING = {
     "gpt-4o": (2.50, 10.00),
@@ -35,3 +39,192 @@ def compare_costs(input_tokens: int, output_tokens: int) -> Dict[str, float]:
         if cost is not None:
             costs[model] = cost
     return dict(sorted(costs.items(), key=lambda x: x[1]))
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _model_codes(models: Sequence[str], np):
+    """Distinct model names and each record's index into them, as an intp array.
+
+    A dict lookup per record is several times faster than np.unique on a
+    string array (and avoids converting a list of names to one).
+    """
+    codes: Dict[str, int] = {}
+    setdefault = codes.setdefault
+    index = np.fromiter((setdefault(str(m), len(codes)) for m in models), dtype=np.intp, count=len(models))
+    return list(codes), index
+
+
+def calculate_costs_bulk(
+    models: Union[str, Sequence[str]],
+    input_tokens: Sequence[int],
+    output_tokens: Sequence[int],
+    use_numpy: Optional[bool] = None,
+):
+    """Price many usage records at once.
+
+    Args:
+        models: One model name for all records, or one per record.
+        input_tokens: Input token counts.
+        output_tokens: Output token counts.
+        use_numpy: Force (True) or avoid (False) NumPy; by default it is used
+            when installed.
+
+    Returns:
+        Unrounded cost per record as a NumPy float64 array (or array('d')
+        without NumPy); NaN for models not in PRICING.
+    """
+    np = _numpy() if use_numpy is not False else None
+    if use_numpy and np is None:
+        raise ImportError("numpy is required for use_numpy=True")
+    nan = float("nan")
+
+    if np is not None:
+        inputs = np.array(input_tokens, dtype=np.float64)
+        outputs = np.array(output_tokens, dtype=np.float64)
+        # Same operation order as calculate_cost, so rounded results agree.
+        inputs /= 1_000_000
+        outputs /= 1_000_000
+        if isinstance(models, str):
+            input_price, output_price = PRICING.get(models, (nan, nan))
+            return inputs * input_price + outputs * output_price
+        names, index = _model_codes(models, np)
+        prices = np.array([PRICING.get(name, (nan, nan)) for name in names], dtype=np.float64).reshape(-1, 2)
+        return inputs * prices[index, 0] + outputs * prices[index, 1]
+
+    if isinstance(models, str):
+        i_price, o_price = PRICING.get(models, (nan, nan))
+        return array("d", [i / 1_000_000 * i_price + o / 1_000_000 * o_price for i, o in zip(input_tokens, output_tokens)])
+    unknown = (nan, nan)
+    get = PRICING.get
+    return array("d", [
+        i / 1_000_000 * p[0] + o / 1_000_000 * p[1]
+        for p, i, o in zip(map(get, models, repeat(unknown)), input_tokens, output_tokens)
+    ])
+
+
+def _add_usage(totals: Dict[str, List[int]], models, input_tokens, output_tokens, np=None) -> None:
+    """Accumulate [requests, input, output] per model into totals."""
+    if np is not None and not isinstance(models, str):
+        names, index = _model_codes(models, np)
+        requests = np.bincount(index, minlength=len(names))
+        inputs = np.bincount(index, weights=np.asarray(input_tokens, dtype=np.float64), minlength=len(names))
+        outputs = np.bincount(index, weights=np.asarray(output_tokens, dtype=np.float64), minlength=len(names))
+        for name, n, i, o in zip(names, requests.tolist(), inputs.tolist(), outputs.tolist()):
+            row = totals.setdefault(name, [0, 0, 0])
+            row[0] += n
+            row[1] += int(i)
+            row[2] += int(o)
+        return
+    if isinstance(models, str):
+        row = totals.setdefault(models, [0, 0, 0])
+        row[0] += len(input_tokens)
+        row[1] += int(sum(input_tokens))
+        row[2] += int(sum(output_tokens))
+        return
+    for model, i, o in zip(models, input_tokens, output_tokens):
+        row = totals.get(model)
+        if row is None:
+            row = totals[model] = [0, 0, 0]
+        row[0] += 1
+        row[1] += i
+        row[2] += o
+
+
+def _usage_summary(totals: Dict[str, List[int]]) -> Dict[str, Dict[str, Union[int, float, None]]]:
+    summary = {}
+    for model, (requests, inputs, outputs) in totals.items():
+        summary[model] = {
+            "requests": requests,
+            "input_tokens": inputs,
+            "output_tokens": outputs,
+            "cost": calculate_cost(model, inputs, outputs),
+        }
+    return dict(sorted(summary.items(), key=lambda x: -(x[1]["cost"] or 0)))
+
+
+def summarize_costs(
+    models: Union[str, Sequence[str]],
+    input_tokens: Sequence[int],
+    output_tokens: Sequence[int],
+    use_numpy: Optional[bool] = None,
+) -> Dict[str, Dict[str, Union[int, float, None]]]:
+    """Group usage records by model and price each group.
+
+    Token totals are summed per model first and priced once per model, so
+    the cost of a group is exact and the work is a single grouping pass.
+
+    Args:
+        models: One model name for all records, or one per record.
+        input_tokens: Input token counts.
+        output_tokens: Output token counts.
+        use_numpy: As in calculate_costs_bulk.
+
+    Returns:
+        {model: {'requests', 'input_tokens', 'output_tokens', 'cost'}}, most
+        expensive first; cost is None for models not in PRICING.
+    """
+    np = _numpy() if use_numpy is not False else None
+    totals: Dict[str, List[int]] = {}
+    _add_usage(totals, models, input_tokens, output_tokens, np)
+    return _usage_summary(totals)
+
+
+def _iter_usage_records(path: str, fmt: str):
+    with open(path, "r", encoding="utf-8", newline="" if fmt == "csv" else None) as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def summarize_usage_log(
+    path: str,
+    fmt: Optional[str] = None,
+    model_field: str = "model",
+    input_field: str = "input_tokens",
+    output_field: str = "output_tokens",
+    default_model: Optional[str] = None,
+    batch_size: int = 100_000,
+) -> Dict[str, Dict[str, Union[int, float, None]]]:
+    """Stream a CSV or JSONL usage log from disk and summarize its cost by model.
+
+    Args:
+        path: Usage log file.
+        fmt: 'csv' or 'jsonl' (default: from the file extension).
+        model_field: Field holding the model name.
+        input_field: Field holding input tokens.
+        output_field: Field holding output tokens.
+        default_model: Model for records without a model field.
+        batch_size: Records grouped per pass; bounds memory.
+
+    Returns:
+        Summary as returned by summarize_costs.
+    """
+    if fmt is None:
+        fmt = "csv" if path.lower().endswith(".csv") else "jsonl"
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError("fmt must be 'csv' or 'jsonl'")
+    np = _numpy()
+    totals: Dict[str, List[int]] = {}
+    models: List[str] = []
+    inputs: List[int] = []
+    outputs: List[int] = []
+    for record in _iter_usage_records(path, fmt):
+        models.append(record.get(model_field) or default_model or "unknown")
+        inputs.append(int(record.get(input_field) or 0))
+        outputs.append(int(record.get(output_field) or 0))
+        if len(models) >= batch_size:
+            _add_usage(totals, models, inputs, outputs, np)
+            models, inputs, outputs = [], [], []
+    if models:
+        _add_usage(totals, models, inputs, outputs, np)
+    return _usage_summary(totals)
@@ -1,38 +1,394 @@
 """Prompt template manager with Jinja2 support."""
 
+import json
 import os
-from typing import Dict, List, Optional
+import re
+import string
+from collections import OrderedDict
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+from devkit.utils import parallel_map
 
 DEFAULT_PROMPTS_DIR = os.path.expanduser("~/.devkit/prompts")
 
+TEMPLATE_CACHE_SIZE = 512
+
+
+class CompiledTemplate(str):
+    """A template's source text together with its compiled renderer.
+
+    Compares equal to (and can be used anywhere as) the source string;
+    render(variables) skips re-parsing. Create with compile_template().
+
+    Attributes:
+        variables: Names of the top-level variables a row must provide. For
+            Jinja2, names the template does not define itself and references
+            outside conditionals, `default` filters and `is defined` tests.
+    """
+
+    # Bound per instance to the Jinja2 template's or str.format_map's render,
+    # so a render is a single call.
+    render: Callable[[Dict[str, Any]], str]
+    variables: FrozenSet[str]
+
+    def missing(self, row: Any) -> List[str]:
+        """Sorted variables absent from row ([] if it can be rendered)."""
+        if not isinstance(row, dict):
+            return sorted(self.variables)
+        return sorted(name for name in self.variables if name not in row)
+
+    def __reduce__(self):
+        # Compiled Jinja2 code does not pickle; recompile on the other side.
+        return compile_template, (str(self),)
+
+
+@lru_cache(maxsize=1)
+def _jinja_env():
+    """The shared Jinja2 Environment, or None if Jinja2 is not installed."""
+    try:
+        from jinja2 import Environment
+    except ImportError:
+        return None
+    return Environment(cache_size=0)
+
+
+_FIELD_ROOT = re.compile(r"[^.\[]*")
+
+
+def _format_variables(source: str) -> Set[str]:
+    """Root names of the named replacement fields of a str.format template."""
+    names = set()
+    for _, field, spec, _ in string.Formatter().parse(source):
+        if field:
+            root = _FIELD_ROOT.match(field).group()
+            if root and not root.isdigit():
+                names.add(root)
+        if spec:
+            names |= _format_variables(spec)
+    return names
+
+
+_OPTIONAL_FILTERS = frozenset({"default", "d"})
+_OPTIONAL_TESTS = frozenset({"defined", "undefined", "none"})
+
+
+def _jinja_variables(ast) -> Set[str]:
+    """Undeclared names of a Jinja2 AST that every render needs.
+
+    Names only referenced inside if-blocks, conditional expressions,
+    default filters or defined/undefined/none tests are optional: a render
+    without them still succeeds.
+    """
+    from jinja2 import meta, nodes
+    used = set()
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (nodes.If, nodes.CondExpr)):
+            continue
+        if isinstance(node, nodes.Test) and node.name in _OPTIONAL_TESTS:
+            continue
+        if isinstance(node, nodes.Filter) and node.name in _OPTIONAL_FILTERS:
+            stack.extend(child for child in node.iter_child_nodes() if child is not node.node)
+            continue
+        if isinstance(node, nodes.Name) and node.ctx == "load":
+            used.add(node.name)
+        stack.extend(node.iter_child_nodes())
+    return meta.find_undeclared_variables(ast) & used
+
+
+def _render_unparsed(source: str, variables: Dict[str, Any]) -> str:
+    return _jinja_env().from_string(source).render(variables)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _compile(source: str) -> CompiledTemplate:
+    compiled = CompiledTemplate(source)
+    if "{%" in source or "{{" in source:
+        env = _jinja_env()
+        if env is not None:
+            from jinja2 import TemplateSyntaxError
+            try:
+                ast = env.parse(source)
+            except TemplateSyntaxError:
+                # Still loadable as text; each render raises the syntax error.
+                compiled.variables = frozenset()
+                compiled.render = partial(_render_unparsed, source)
+                return compiled
+            compiled.variables = frozenset(_jinja_variables(ast))
+            compiled.render = env.from_string(ast).render
+            return compiled
+    compiled.render = source.format_map
+    try:
+        compiled.variables = frozenset(_format_variables(source))
+    except ValueError:
+        # Malformed; rendering raises the format error itself.
+        compiled.variables = frozenset()
+    return compiled
+
+
+def compile_template(template: str) -> CompiledTemplate:
+    """Compile a template once; repeated sources come from a bounded LRU cache.
+
+    Templates containing "{{" or "{%" are Jinja2 (when installed), others
+    use str.format, as in render_template.
+
+    Args:
+        template: Template source.
+
+    Returns:
+        CompiledTemplate equal to template.
+    """
+    if type(template) is CompiledTemplate:
+        return template
+    return _compile(str(template))
+
 
 def render_template(template: str, variables: Dict[str, str]) -> str:
-    if "{%" in template or "{{" in template:
-        try:
-            from jinja2 import Template
-            j2 = Template(template)
-            return j2.render(**variables)
-        except ImportError:
-            pass
-    return template.format(**variables)
+    return compile_template(template).render(variables)
+
+
+def _render_task(variables: Dict[str, Any], template: CompiledTemplate) -> str:
+    return template.render(variables)
+
+
+def _row_error(template: CompiledTemplate, row: Any) -> Optional[str]:
+    """Why row cannot be rendered, or None if it has every required variable."""
+    if not isinstance(row, dict):
+        return "not a JSON object"
+    missing = template.missing(row)
+    return f"missing variables: {', '.join(missing)}" if missing else None
+
+
+def _try_render(template: CompiledTemplate, row: Dict[str, Any]) -> Tuple[bool, str]:
+    """Render a row that passed _row_error: (True, text), or (False, reason) if rendering raised.
+
+    Nested lookups ({user[name]}, user.name.first) and variables used inside
+    conditions are not checked up front, so they can still fail here.
+    """
+    try:
+        return True, template.render(row)
+    except Exception as e:
+        return False, f"render error: {type(e).__name__}: {e}"
+
+
+def _checked_rows(template: CompiledTemplate, rows: Iterable[Any]) -> Iterator[Dict[str, Any]]:
+    for index, row in enumerate(rows):
+        error = _row_error(template, row)
+        if error is not None:
+            raise ValueError(f"Row {index}: {error}")
+        yield row
+
+
+def _render_row_task(item: Tuple[int, Any], template: CompiledTemplate) -> Tuple[int, bool, str]:
+    """Render one numbered row: (index, True, text) or (index, False, reason) (worker task)."""
+    index, row = item
+    error = _row_error(template, row)
+    if error is not None:
+        return index, False, error
+    return (index, *_try_render(template, row))
+
+
+def _render_skipping(
+    template: CompiledTemplate,
+    rows: Iterable[Any],
+    workers: int,
+    chunk_size: int,
+    errors: Optional[List[Tuple[int, str]]],
+) -> Iterator[str]:
+    task = partial(_render_row_task, template=template)
+    for index, ok, result in parallel_map(task, enumerate(rows), workers=workers, chunk_size=chunk_size):
+        if ok:
+            yield result
+        elif errors is not None:
+            errors.append((index, result))
+
+
+def render_many(
+    template: str,
+    rows: Iterable[Dict[str, Any]],
+    workers: int = 1,
+    chunk_size: int = 256,
+    on_invalid: str = "raise",
+    errors: Optional[List[Tuple[int, str]]] = None,
+) -> Iterator[str]:
+    """Render one template against many variable rows.
+
+    The template is compiled once (and once per worker process); rows are
+    consumed lazily, so any number can be streamed through. Each row is
+    checked against the template's required variables before rendering.
+
+    Args:
+        template: Template source or CompiledTemplate.
+        rows: Iterable of variable dicts.
+        workers: Number of worker processes.
+        chunk_size: Rows sent to a worker per task.
+        on_invalid: 'raise' (ValueError) for rows missing a variable, or
+            'skip' for rows missing a variable or whose render raises.
+        errors: Optional list that receives (row index, reason) of skipped rows.
+
+    Yields:
+        The rendered prompt for each valid row, in input order.
+    """
+    if on_invalid not in ("raise", "skip"):
+        raise ValueError("on_invalid must be 'raise' or 'skip'")
+    compiled = compile_template(template)
+    if on_invalid == "skip":
+        return _render_skipping(compiled, rows, workers, chunk_size, errors)
+    rows = _checked_rows(compiled, rows)
+    if workers <= 1:
+        return map(compiled.render, rows)
+    return parallel_map(partial(_render_task, template=compiled), rows, workers=workers, chunk_size=chunk_size)
+
+
+def _init_render_worker(model: Optional[str], method: str) -> None:
+    if model is not None:
+        from devkit.ai.token_counter import _init_encoder
+        _init_encoder(model, method)
+
+
+def _jsonl_line_prompt(
+    numbered_line: Tuple[int, str],
+    template: CompiledTemplate,
+    output_field: str,
+    model: Optional[str],
+    method: str,
+) -> Tuple[int, bool, str]:
+    """Render the template for one numbered JSONL variables line (worker task).
+
+    Returns (line number, True, output line), or (line number, False, reason)
+    for an invalid record.
+    """
+    line_no, line = numbered_line
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        return line_no, False, f"invalid JSON: {e}"
+    error = _row_error(template, record)
+    if error is not None:
+        return line_no, False, error
+    ok, prompt = _try_render(template, record)
+    if not ok:
+        return line_no, False, prompt
+    record[output_field] = prompt
+    if model is not None:
+        from devkit.ai.token_counter import count_tokens
+        record["tokens"] = count_tokens(prompt, model, method=method)
+    return line_no, True, json.dumps(record, ensure_ascii=False)
+
+
+def write_rendered_prompts(
+    template: str,
+    input_path: str,
+    output_path: str,
+    output_field: str = "prompt",
+    model: Optional[str] = None,
+    method: str = "exact",
+    workers: int = 1,
+    chunk_size: int = 256,
+    on_invalid: str = "raise",
+    errors: Optional[List[Tuple[int, str]]] = None,
+) -> int:
+    """Render a template for every record of a JSONL file of variables.
+
+    Each output record is the input record with the rendered prompt added
+    (and its token count under 'tokens' when model is given). Records
+    missing a required variable are rejected before rendering.
+
+    Args:
+        template: Template source or CompiledTemplate.
+        input_path: JSONL file, one variables object per line.
+        output_path: Output JSONL file.
+        output_field: Name of the added prompt key.
+        model: Model whose tokenizer counts each prompt (default: no counts).
+        method: Token counting method, as in count_tokens.
+        workers: Number of worker processes.
+        chunk_size: Records sent to a worker per task.
+        on_invalid: 'raise' (ValueError) or 'skip' for invalid records: bad
+            JSON, a missing variable, or a render that raises.
+        errors: Optional list that receives (line number, reason) of skipped records.
+
+    Returns:
+        Number of records written.
+    """
+    if on_invalid not in ("raise", "skip"):
+        raise ValueError("on_invalid must be 'raise' or 'skip'")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    task = partial(_jsonl_line_prompt, template=compile_template(template), output_field=output_field,
+                   model=model, method=method)
+    # Load the encoder in the parent first so forked workers inherit it.
+    if workers > 1:
+        _init_render_worker(model, method)
+    count = 0
+    with open(input_path, "r", encoding="utf-8") as f, open(output_path, "w", encoding="utf-8") as out:
+        lines = ((line_no, line) for line_no, line in enumerate(f, 1) if line.strip())
+        for line_no, ok, result in parallel_map(task, lines, workers=workers, chunk_size=chunk_size,
+                                                initializer=_init_render_worker, initargs=(model, method)):
+            if ok:
+                out.write(result + "\n")
+                count += 1
+            elif on_invalid == "raise":
+                raise ValueError(f"Line {line_no}: {result}")
+            elif errors is not None:
+                errors.append((line_no, result))
+    return count
 
 
 def save_template(name: str, content: str, prompts_dir: Optional[str] = None) -> str:
     directory = prompts_dir or DEFAULT_PROMPTS_DIR
     os.makedirs(directory, exist_ok=True)
     path = os.path.join(directory, f"{name}.txt")
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(content)
+    _write_atomic(path, content)
+    _loaded.pop(path, None)
     return path
 
 
-def load_template(name: str, prompts_dir: Optional[str] = None) -> Optional[str]:
+def _write_atomic(path: str, content: str) -> None:
+    """Write a text file via a temporary file and rename, so readers never see it half-written."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+# path -> ((st_mtime_ns, st_size), CompiledTemplate), least recently used first.
+_loaded: "OrderedDict[str, Tuple[Tuple[int, int], CompiledTemplate]]" = OrderedDict()
+
+
+def load_template(name: str, prompts_dir: Optional[str] = None) -> Optional[CompiledTemplate]:
+    """Load a saved template, compiled.
+
+    Files are re-read only when their modification time or size changes.
+
+    Returns:
+        CompiledTemplate (equal to the file's text), or None if not found.
+    """
     directory = prompts_dir or DEFAULT_PROMPTS_DIR
     path = os.path.join(directory, f"{name}.txt")
+    try:
+        st = os.stat(path)
+    except OSError:
+        _loaded.pop(path, None)
+        return None
+    version = (st.st_mtime_ns, st.st_size)
+    entry = _loaded.get(path)
+    if entry is not None and entry[0] == version:
+        _loaded.move_to_end(path)
+        return entry[1]
     if not os.path.isfile(path):
         return None
     with open(path, "r", encoding="utf-8") as f:
-        return f.read()
+        compiled = compile_template(f.read())
+    _loaded[path] = (version, compiled)
+    if len(_loaded) > TEMPLATE_CACHE_SIZE:
+        _loaded.popitem(last=False)
+    return compiled
 
 
 def list_templates(prompts_dir: Optional[str] = None) -> List[str]:
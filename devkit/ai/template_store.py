@@ -0,0 +1,143 @@
+"""Prompt templates stored in one indexed SQLite file."""
+
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+from devkit.ai.prompt_template import CompiledTemplate, _write_atomic, compile_template
+
+DEFAULT_STORE_PATH = os.path.expanduser("~/.devkit/prompts.sqlite3")
+
+
+class TemplateStore:
+    """Named prompt templates in a single SQLite database, cached in memory.
+
+    Lookups are served from memory and cost one `PRAGMA data_version` check
+    (no filesystem calls), which also picks up saves made by other processes.
+    Each save is a single transaction, so readers see either the old or the
+    new content, never a partial write.
+
+    Args:
+        path: SQLite database file, created with its directory if missing
+            (default: DEFAULT_STORE_PATH).
+        wal: Use SQLite's write-ahead log, which lets readers run alongside a
+            writer but needs shared memory, so it must not be used on network
+            filesystems (e.g. NFS home directories). Off by default: the
+            rollback journal works everywhere.
+    """
+
+    def __init__(self, path: Optional[str] = None, wal: bool = False):
+        path = path or DEFAULT_STORE_PATH
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        if wal:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS templates ("
+            "name TEXT PRIMARY KEY, content TEXT NOT NULL, updated REAL NOT NULL) WITHOUT ROWID"
+        )
+        self._cache: Dict[str, CompiledTemplate] = {}
+        self._names: Optional[List[str]] = None
+        self._version = self._data_version()
+
+    def _data_version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _check_version(self) -> None:
+        """Drop cached entries if another connection has changed the database."""
+        version = self._data_version()
+        if version != self._version:
+            self._version = version
+            self._cache.clear()
+            self._names = None
+
+    def load(self, name: str) -> Optional[CompiledTemplate]:
+        """Return the compiled template, or None if not found."""
+        self._check_version()
+        compiled = self._cache.get(name)
+        if compiled is None:
+            row = self._conn.execute("SELECT content FROM templates WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                return None
+            compiled = self._cache[name] = compile_template(row[0])
+        return compiled
+
+    def save(self, name: str, content: str) -> None:
+        """Create or replace a template."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO templates (name, content, updated) VALUES (?, ?, ?)",
+            (name, content, time.time()),
+        )
+        self._cache.pop(name, None)
+        self._names = None
+
+    def delete(self, name: str) -> bool:
+        """Remove a template; return whether it existed."""
+        cursor = self._conn.execute("DELETE FROM templates WHERE name = ?", (name,))
+        self._cache.pop(name, None)
+        self._names = None
+        return cursor.rowcount > 0
+
+    def names(self) -> List[str]:
+        """Sorted template names."""
+        self._check_version()
+        if self._names is None:
+            self._names = [row[0] for row in self._conn.execute("SELECT name FROM templates ORDER BY name")]
+        return list(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return self.load(name) is not None
+
+    def __len__(self) -> int:
+        return len(self.names())
+
+    def import_dir(self, directory: str) -> int:
+        """Import every <name>.txt file of a prompts directory in one transaction.
+
+        Returns:
+            Number of templates imported.
+        """
+        rows = []
+        for filename in sorted(os.listdir(directory)):
+            path = os.path.join(directory, filename)
+            if filename.endswith(".txt") and os.path.isfile(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    rows.append((filename.rsplit(".", 1)[0], f.read(), time.time()))
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany("INSERT OR REPLACE INTO templates (name, content, updated) VALUES (?, ?, ?)", rows)
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+        self._cache.clear()
+        self._names = None
+        return len(rows)
+
+    def export_dir(self, directory: str) -> int:
+        """Write every template to <directory>/<name>.txt, each file replaced atomically.
+
+        Returns:
+            Number of templates exported.
+        """
+        os.makedirs(directory, exist_ok=True)
+        count = 0
+        for name, content in self._conn.execute("SELECT name, content FROM templates ORDER BY name"):
+            _write_atomic(os.path.join(directory, f"{name}.txt"), content)
+            count += 1
+        return count
+
+    def close(self) -> None:
+        """Close the database."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self) -> "TemplateStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
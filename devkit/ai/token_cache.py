@@ -0,0 +1,160 @@
+"""Persistent token-count cache keyed by content hash and encoding."""
+
+import atexit
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Dict, Optional, Union
+
+DEFAULT_CACHE_PATH = os.path.expanduser("~/.devkit/token_cache.sqlite3")
+
+
+def content_digest(data: Union[str, bytes]) -> bytes:
+    """128-bit BLAKE2b digest of text (UTF-8) or bytes."""
+    if isinstance(data, str):
+        data = data.encode("utf-8", "surrogatepass")
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> bytes:
+    """128-bit BLAKE2b digest of a file's bytes, read in chunks."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.digest()
+
+
+class TokenCache:
+    """SQLite-backed cache of token counts with size-bounded LRU eviction.
+
+    Entries are keyed by a content digest and an encoding name and stamped
+    with their last use; once more than max_entries are stored, the least
+    recently used tenth is evicted. Hit/miss counts accumulate across
+    sessions.
+
+    Args:
+        path: SQLite database file, created with its directory if missing
+            (default: DEFAULT_CACHE_PATH).
+        max_entries: Maximum number of cached counts.
+    """
+
+    _STATS_FLUSH_EVERY = 256
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 1_000_000):
+        if max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        path = path or DEFAULT_CACHE_PATH
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS counts ("
+            "digest BLOB NOT NULL, encoding TEXT NOT NULL, tokens INTEGER NOT NULL, used REAL NOT NULL, "
+            "PRIMARY KEY (digest, encoding)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS counts_used ON counts (used)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM counts").fetchone()[0]
+
+    def get(self, digest: bytes, encoding: str) -> Optional[int]:
+        """Return the cached count, or None (counted as a hit or miss)."""
+        row = self._conn.execute(
+            "SELECT tokens FROM counts WHERE digest = ? AND encoding = ?", (digest, encoding)
+        ).fetchone()
+        if self.hits + self.misses >= self._STATS_FLUSH_EVERY:
+            self.flush_stats()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._conn.execute(
+            "UPDATE counts SET used = ? WHERE digest = ? AND encoding = ?", (time.time(), digest, encoding)
+        )
+        return row[0]
+
+    def put(self, digest: bytes, encoding: str, tokens: int) -> None:
+        """Store a count, evicting least recently used entries when full."""
+        cursor = self._conn.execute(
+            "INSERT OR REPLACE INTO counts (digest, encoding, tokens, used) VALUES (?, ?, ?, ?)",
+            (digest, encoding, tokens, time.time()),
+        )
+        self._entries += cursor.rowcount
+        if self._entries > self.max_entries:
+            self._evict()
+
+    def _evict(self) -> None:
+        keep = self.max_entries - self.max_entries // 10
+        self._conn.execute(
+            "DELETE FROM counts WHERE (digest, encoding) IN "
+            "(SELECT digest, encoding FROM counts ORDER BY used LIMIT ?)",
+            (self._entries - keep,),
+        )
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM counts").fetchone()[0]
+
+    def stats(self) -> Dict[str, Union[int, float, str]]:
+        """Cumulative hits/misses (including this session), entry count and file size."""
+        # Other processes may have added entries since this connection counted them.
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM counts").fetchone()[0]
+        saved = dict(self._conn.execute("SELECT name, value FROM stats").fetchall())
+        hits = saved.get("hits", 0) + self.hits
+        misses = saved.get("misses", 0) + self.misses
+        return {
+            "path": self.path,
+            "entries": self._entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "size_bytes": os.path.getsize(self.path),
+        }
+
+    def flush_stats(self) -> None:
+        """Add this session's hits/misses to the persisted totals."""
+        for name, value in (("hits", self.hits), ("misses", self.misses)):
+            if value:
+                self._conn.execute(
+                    "INSERT INTO stats (name, value) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                    (name, value),
+                )
+        self.hits = self.misses = 0
+
+    def clear(self) -> None:
+        """Remove all cached counts and statistics."""
+        self._conn.execute("DELETE FROM counts")
+        self._conn.execute("DELETE FROM stats")
+        self._entries = self.hits = self.misses = 0
+
+    def close(self) -> None:
+        """Persist statistics and close the database."""
+        if self._conn is not None:
+            self.flush_stats()
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self) -> "TokenCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+_default_cache: Optional[TokenCache] = None
+_default_cache_pid = 0
+
+
+def get_token_cache() -> TokenCache:
+    """Return this process's TokenCache at DEFAULT_CACHE_PATH, opening it on first use."""
+    global _default_cache, _default_cache_pid
+    if _default_cache is None or _default_cache._conn is None or _default_cache_pid != os.getpid():
+        # A connection inherited through fork must not be reused.
+        _default_cache = TokenCache()
+        _default_cache_pid = os.getpid()
+        atexit.register(_default_cache.close)
+    return _default_cache
@@ -1,6 +1,11 @@
 """Token counter for LLM models."""
 
-from typing import List
+import json
+import os
+from array import array
+from functools import lru_cache, partial
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 MODEL_ENCODINGS = {
     "gpt-4o": "o200k_base", "gpt-4o-mini": "o200k_base",
@@ -10,21 +15,385 @@ MODEL_ENCODINGS = {
 }
 
 
+def _approx_class_table() -> bytes:
+    """Map each UTF-8 byte to a one-byte character class for approx_tokens."""
+    table = bytearray(b"c" * 256)
+    for byte in range(0x80):
+        char = chr(byte)
+        if char.isalpha():
+            table[byte] = ord("a")
+        elif char.isdigit():
+            table[byte] = ord("0")
+        elif char in "\r\n":
+            table[byte] = ord("\n")
+        elif char in " \t":
+            table[byte] = byte
+        elif char.isprintable():
+            table[byte] = ord(".")
+    # Lead bytes: E3..E9 start U+3000..U+9FFF (CJK, kana, CJK punctuation).
+    for byte in range(0xC0, 0x100):
+        table[byte] = ord("h") if 0xE3 <= byte <= 0xE9 else ord("u")
+    return bytes(table)
+
+
+_APPROX_CLASSES = _approx_class_table()
+_APPROX_CONTINUATION = bytes(range(0x80, 0xC0))
+# Per run feature, a table folding the class string to that class vs. "x".
+_APPROX_RUN_TABLES = {
+    run: bytes(c if c == run[0] else ord("x") for c in range(256)) for run in (b"a", b"0", b".", b"\n", b"  ")
+}
+
+# Tokens per feature, in approx_feature_vector order: ASCII letter runs,
+# letters, digit runs, digits, CJK chars, ASCII punctuation runs, punctuation
+# chars, newline runs, indent runs (tabs and runs of 2+ spaces), other chars.
+# Fitted against the real rank files with benchmarks/calibrate_token_approx.py
+# on benchmarks/data/token_sample.jsonl (294 texts); rerun it to refit.
+_APPROX_COEFFICIENTS = {
+    "cl100k_base": (0.873, 0.035, 1.235, 0.302, 1.166, 0.560, 0.150, 1.071, 0.267, 0.700),
+    "o200k_base": (0.825, 0.041, 1.215, 0.306, 0.727, 0.579, 0.160, 1.149, 0.285, 0.300),
+}
+
+
 def supported_models() -> List[str]:
     return list(MODEL_ENCODINGS.keys())
 
 
-def count_tokens(text: str, model: str = "gpt-4o") -> int:
+@lru_cache(maxsize=None)
+def _get_encoding(encoding_name: str):
+    """Load a tiktoken encoding once per process."""
     try:
         import tiktoken
     except ImportError:
         raise ImportError("tiktoken is required: pip install devkit-tools[ai]")
+    return tiktoken.get_encoding(encoding_name)
+
+
+def get_encoder(model: str = "gpt-4o"):
+    """Return the (cached) tiktoken encoding used for a model."""
+    return _get_encoding(MODEL_ENCODINGS.get(model, "cl100k_base"))
+
+
+@lru_cache(maxsize=None)
+def _encoding_available(encoding_name: str) -> bool:
+    """Whether the encoding loads here; failures (no tiktoken, no network) are remembered."""
+    try:
+        _get_encoding(encoding_name)
+    except Exception:
+        return False
+    return True
+
+
+def _runs(classes: bytes, run: bytes) -> int:
+    """Count runs of a class (run is its class byte, doubled for runs of 2+) in a class string."""
+    folded = classes.translate(_APPROX_RUN_TABLES[run])
+    return folded.startswith(run) + folded.count(b"x" + run)
+
+
+def approx_feature_vector(text: str) -> List[int]:
+    """Character-class run and character counts used by approx_tokens.
+
+    The text is reduced to one class byte per character with bytes.translate,
+    after which every feature is a bytes.count.
+    """
+    classes = text.encode("utf-8", "surrogatepass").translate(_APPROX_CLASSES, _APPROX_CONTINUATION)
+    return [
+        _runs(classes, b"a"), classes.count(b"a"),
+        _runs(classes, b"0"), classes.count(b"0"),
+        classes.count(b"h"),
+        _runs(classes, b"."), classes.count(b"."),
+        _runs(classes, b"\n"),
+        classes.count(b"\t") + _runs(classes, b"  "),
+        classes.count(b"u"),
+    ]
+
+
+def approx_tokens(text: str, model: str = "gpt-4o") -> int:
+    """Estimate a token count without tiktoken from character-class statistics.
+
+    A linear model over runs and characters of letters, digits, CJK,
+    punctuation, newlines, indentation and other non-ASCII text, with
+    coefficients per encoding. It needs no dependencies or rank files and
+    only translates and counts bytes instead of running BPE.
+
+    Relative error against tiktoken on benchmarks/data/token_sample.jsonl
+    (294 English/Chinese prose and Python texts; 5-fold held-out figures in
+    parentheses): cl100k_base mean 7.0% (7.5%), p90 14.3% (14.3%), max 38.9%;
+    o200k_base mean 6.5% (7.4%), p90 12.4% (13.3%), max 50.0%. The maxima
+    are texts of a few tokens, where one token off is a large fraction.
+
+    Args:
+        text: Input text.
+        model: Model name; selects the encoding's coefficients.
+
+    Returns:
+        Estimated token count (at least 1 for non-empty text).
+    """
+    return _round_estimate(_approx_estimate(text, model), bool(text))
+
+
+def _approx_estimate(text: str, model: str) -> float:
+    coefficients = _APPROX_COEFFICIENTS[MODEL_ENCODINGS.get(model, "cl100k_base")]
+    return sum(c * f for c, f in zip(coefficients, approx_feature_vector(text)))
+
+
+def _round_estimate(estimate: float, nonempty: bool) -> int:
+    return max(1, int(estimate + 0.5)) if nonempty else 0
+
+
+def _use_approx(method: str, model: str) -> bool:
+    if method not in ("exact", "approx", "auto"):
+        raise ValueError("method must be 'exact', 'approx' or 'auto'")
+    if method == "auto":
+        return not _encoding_available(MODEL_ENCODINGS.get(model, "cl100k_base"))
+    return method == "approx"
+
+
+def _resolve_cache(cache):
+    """Map the cache argument (None/False, True or a TokenCache) to a TokenCache or None."""
+    if not cache:
+        return None
+    if cache is True:
+        from devkit.ai.token_cache import get_token_cache
+        return get_token_cache()
+    return cache
+
+
+def count_tokens(text: str, model: str = "gpt-4o", method: str = "exact", cache=None) -> int:
+    """Count tokens for a model.
+
+    Args:
+        text: Input text.
+        model: Model name for tokenization.
+        method: 'exact' (tiktoken), 'approx' (approx_tokens), or 'auto' to
+            fall back to approx when tiktoken or its rank files are unavailable.
+        cache: Optional TokenCache, or True for the default one under
+            ~/.devkit; exact counts are looked up by content hash first.
+
+    Returns:
+        Token count.
+    """
+    if _use_approx(method, model):
+        return approx_tokens(text, model)
+    cache = _resolve_cache(cache)
+    if cache is None:
+        return len(get_encoder(model).encode(text))
+
+    from devkit.ai.token_cache import content_digest
     encoding_name = MODEL_ENCODINGS.get(model, "cl100k_base")
-    enc = tiktoken.get_encoding(encoding_name)
-    return len(enc.encode(text))
+    digest = content_digest(text)
+    count = cache.get(digest, encoding_name)
+    if count is None:
+        count = len(get_encoder(model).encode(text))
+        cache.put(digest, encoding_name, count)
+    return count
+
+
+def count_tokens_batch(
+    texts: Iterable[str], model: str = "gpt-4o", num_threads: Optional[int] = None, batch_size: int = 10000
+) -> array:
+    """Count tokens for many texts, encoding slices of each batch on threads.
+
+    tiktoken's encoder releases the GIL, so threads encode in parallel. Each
+    thread gets one contiguous slice per batch rather than one task per text
+    (as Encoding.encode_batch does), which keeps per-item overhead at that of
+    a plain loop when texts are short.
+
+    Args:
+        texts: Iterable of input strings.
+        model: Model name for tokenization.
+        num_threads: Encoder threads; defaults to the CPU count, up to 8.
+        batch_size: Texts read per batch; bounds the memory held at once.
+
+    Returns:
+        array('q') of token counts, in input order.
+    """
+    encode = get_encoder(model).encode
+
+    def count_slice(part):
+        return [len(encode(text)) for text in part]
+
+    if num_threads is None:
+        num_threads = min(8, os.cpu_count() or 1)
+    counts = array("q")
+    iterator = iter(texts)
+    if num_threads <= 1:
+        for text in iterator:
+            counts.append(len(encode(text)))
+        return counts
+
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(num_threads) as pool:
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return counts
+            step = -(-len(batch) // num_threads)
+            parts = [batch[i:i + step] for i in range(0, len(batch), step)]
+            for part_counts in pool.map(count_slice, parts):
+                counts.extend(part_counts)
 
 
-def count_tokens_file(file_path: str, model: str = "gpt-4o") -> int:
+def _last_safe_cut(text: str) -> int:
+    """Return the index just after the last newline followed by non-whitespace, or 0.
+
+    tiktoken's pre-tokenizer patterns always end a piece at such a newline
+    and start a fresh one after it, so encoding both sides separately
+    gives the same tokens as encoding the whole text.
+    """
+    pos = text.rfind("\n", 0, len(text) - 1)
+    while pos >= 0 and text[pos + 1].isspace():
+        pos = text.rfind("\n", 0, pos)
+    return pos + 1
+
+
+def count_tokens_file(
+    file_path: str, model: str = "gpt-4o", chunk_size: int = 1 << 20, method: str = "exact", cache=None
+) -> int:
+    """Count tokens in a UTF-8 file, reading it in chunks.
+
+    Chunks are cut after a newline followed by non-whitespace, so the total
+    equals encoding the whole file at once while memory stays proportional
+    to chunk_size (plus the longest run of text without such a newline).
+
+    Args:
+        file_path: Path to the text file.
+        model: Model name for tokenization.
+        chunk_size: Number of characters read per chunk.
+        method: 'exact', 'approx' or 'auto', as in count_tokens.
+        cache: Optional TokenCache or True, as in count_tokens; keyed by a
+            hash of the file's bytes.
+
+    Returns:
+        Total token count.
+    """
+    approx = _use_approx(method, model)
+    cache = None if approx else _resolve_cache(cache)
+    if cache is not None:
+        from devkit.ai.token_cache import file_digest
+        encoding_name = MODEL_ENCODINGS.get(model, "cl100k_base")
+        digest = file_digest(file_path)
+        count = cache.get(digest, encoding_name)
+        if count is None:
+            count = count_tokens_file(file_path, model, chunk_size)
+            cache.put(digest, encoding_name, count)
+        return count
+    if approx:
+        def measure(text):
+            return _approx_estimate(text, model)
+    else:
+        encode = get_encoder(model).encode
+
+        def measure(text):
+            return len(encode(text))
+    total = 0
+    seen = False
+    carry = ""
     with open(file_path, "r", encoding="utf-8") as f:
-        text = f.read()
-    return count_tokens(text, model)
+        for chunk in iter(lambda: f.read(chunk_size), ""):
+            seen = True
+            buffer = carry + chunk if carry else chunk
+            cut = _last_safe_cut(buffer)
+            if cut:
+                total += measure(buffer[:cut])
+                carry = buffer[cut:]
+            else:
+                carry = buffer
+    if carry:
+        total += measure(carry)
+    return _round_estimate(total, seen) if approx else total
+
+
+def iter_record_tokens(
+    file_path: str, field: str = "text", model: str = "gpt-4o", batch_size: int = 10000, method: str = "exact"
+) -> Iterator[int]:
+    """Count tokens in one field of every record of a JSONL file.
+
+    Records are read and encoded batch_size at a time, so memory does not
+    grow with the file. Blank lines are skipped; a missing or null field
+    counts as zero tokens.
+
+    Args:
+        file_path: Path to the JSONL file.
+        field: Name of the text field.
+        model: Model name for tokenization.
+        batch_size: Records encoded per batch.
+        method: 'exact', 'approx' or 'auto', as in count_tokens.
+
+    Yields:
+        Token count of each record, in file order.
+    """
+    approx = _use_approx(method, model)
+    with open(file_path, "r", encoding="utf-8") as f:
+        texts = (_record_text(line, field) for line in f if line.strip())
+        if approx:
+            for text in texts:
+                yield approx_tokens(text, model)
+            return
+        while True:
+            batch = list(islice(texts, batch_size))
+            if not batch:
+                return
+            yield from count_tokens_batch(batch, model, batch_size=batch_size)
+
+
+def _record_text(line: str, field: str) -> str:
+    value = json.loads(line).get(field)
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+def _init_encoder(model: str, method: str) -> None:
+    """Load the encoder up front (pool initializer)."""
+    if not _use_approx(method, model):
+        get_encoder(model)
+
+
+def _file_tokens_task(paths: Tuple[str, str], model: str, method: str, cache: bool) -> Tuple[str, Optional[int]]:
+    path, rel_path = paths
+    try:
+        return rel_path, count_tokens_file(path, model=model, method=method, cache=cache)
+    except (OSError, UnicodeDecodeError):
+        return rel_path, None
+    finally:
+        # Pool workers are terminated without running atexit handlers.
+        import multiprocessing
+        if cache and multiprocessing.parent_process() is not None:
+            _resolve_cache(cache).flush_stats()
+
+
+def count_tokens_dir(
+    directory: str,
+    model: str = "gpt-4o",
+    extensions: Optional[List[str]] = None,
+    workers: int = 1,
+    method: str = "exact",
+    chunk_size: int = 16,
+    cache: bool = False,
+) -> Iterator[Tuple[str, Optional[int]]]:
+    """Count tokens of every matching file under a directory across a process pool.
+
+    Files are selected like devkit.files.extract_code (by extension); each
+    worker loads the encoder once.
+
+    Args:
+        directory: Root directory.
+        model: Model name for tokenization.
+        extensions: Extensions without dots (default: extract_code's DEFAULT_EXTENSIONS).
+        workers: Number of worker processes.
+        method: 'exact', 'approx' or 'auto', as in count_tokens.
+        chunk_size: Files sent to a worker per task.
+        cache: Use the default TokenCache (one connection per process).
+
+    Yields:
+        (relative path, token count), in walk order; the count is None for
+        files that cannot be read as UTF-8.
+    """
+    from devkit.files.extract_code import iter_code_files
+    from devkit.utils import parallel_map
+
+    # Load in the parent first so forked workers inherit the encoder.
+    _init_encoder(model, method)
+    task = partial(_file_tokens_task, model=model, method=method, cache=cache)
+    return parallel_map(task, iter_code_files(directory, extensions), workers=workers, chunk_size=chunk_size,
+                        initializer=_init_encoder, initargs=(model, method))
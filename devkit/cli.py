@@ -7,6 +7,11 @@ import click
 from devkit import __version__
 
 
+def _derived_path(path: str, suffix: str) -> str:
+    """Default output path next to an input: its path without the extension, plus suffix."""
+    return os.path.splitext(path)[0] + suffix
+
+
 @click.group()
 @click.version_option(version=__version__, prog_name="devkit")
 def cli():
@@ -133,9 +138,45 @@ def text():
 
 @text.command("length")
 @click.argument("text_input")
-def text_length(text_input):
+@click.option("--batch", "is_batch", is_flag=True, help="Treat input as a file with one text per line")
+@click.option("--stream", "is_stream", is_flag=True, help="Read the input file in chunks (constant memory)")
+@click.option("--chunk-size", default=1 << 20, type=int, help="Characters per chunk in --stream mode")
+@click.option("--jsonl", "is_jsonl", is_flag=True, help="Score a field of every record in a JSONL file")
+@click.option("--csv", "is_csv", is_flag=True, help="Score a column of every row in a CSV file")
+@click.option("--field", default="content", help="Record field/column to score (--jsonl/--csv)")
+@click.option("--workers", default=1, type=int, help="Worker processes (--jsonl/--csv)")
+@click.option("-o", "--output", default=None, help="Output file (--jsonl/--csv)")
+def text_length(text_input, is_batch, is_stream, chunk_size, is_jsonl, is_csv, field, workers, output):
     """Calculate information-weighted text length."""
     from devkit.text.text_length import calculate_custom_length
+    if is_jsonl or is_csv:
+        from devkit.text.text_length import write_record_lengths
+        fmt = "jsonl" if is_jsonl else "csv"
+        if output is None:
+            output = _derived_path(text_input, f".lengths.{fmt}")
+        try:
+            count = write_record_lengths(text_input, output, field, fmt=fmt, workers=workers)
+        except ValueError as e:
+            click.echo(f"Error: {e}", err=True)
+            raise SystemExit(1)
+        click.echo(f"Wrote {count} records to {output}")
+        return
+    if is_stream:
+        from devkit.text.text_length import calculate_file_length
+        result = calculate_file_length(text_input, chunk_size=chunk_size)
+        click.echo(f"Weighted length: {result}")
+        return
+    if is_batch:
+        from itertools import islice
+        from devkit.text.text_length import calculate_custom_length_batch
+        with open(text_input, "r", encoding="utf-8") as f:
+            lines = (line.rstrip("\r\n") for line in f)
+            while True:
+                lengths = calculate_custom_length_batch(islice(lines, 65536))
+                if not lengths:
+                    break
+                click.echo("\n".join(map(str, lengths)))
+        return
     if os.path.isfile(text_input):
         with open(text_input, "r", encoding="utf-8") as f:
             text_input = f.read()
@@ -148,26 +189,103 @@ def text_length(text_input):
 @click.option("--lang", default="zh", type=click.Choice(["zh", "en"]))
 @click.option("--mode", default="all", type=click.Choice(["all", "filter"]))
 @click.option("--top", default=10, type=int)
-def text_keywords(text_input, lang, mode, top):
+@click.option("--index", "index_path", default=None, help="Keyword index file for TF-IDF scoring (--lang en)")
+@click.option("--jsonl", "is_jsonl", is_flag=True, help="Add keywords to every record of a JSONL file")
+@click.option("--field", default="text", help="Record text field (--jsonl)")
+@click.option("--workers", default=1, type=int, help="Worker processes (--jsonl)")
+@click.option("--jieba-cache", default=None, help="jieba dictionary cache file, created if missing (--jsonl)")
+@click.option("-o", "--output", default=None, help="Output JSONL file (--jsonl)")
+def text_keywords(text_input, lang, mode, top, index_path, is_jsonl, field, workers, jieba_cache, output):
     """Extract weighted keywords from text."""
-    from devkit.text.keywords import extract_keywords
+    from devkit.text.keywords import KeywordIndex, extract_keywords
+    if is_jsonl:
+        from devkit.text.keywords import write_record_keywords
+        if index_path:
+            click.echo("Error: --index cannot be combined with --jsonl", err=True)
+            raise SystemExit(1)
+        if output is None:
+            output = _derived_path(text_input, ".keywords.jsonl")
+        count = write_record_keywords(text_input, output, field, lang=lang, mode=mode, top_k=top,
+                                      workers=workers, cache_file=jieba_cache)
+        click.echo(f"Wrote {count} records to {output}")
+        return
     if os.path.isfile(text_input):
         with open(text_input, "r", encoding="utf-8") as f:
             text_input = f.read()
-    results = extract_keywords(text_input, lang=lang, mode=mode, top_k=top)
+    if index_path and lang != "en":
+        click.echo("Error: --index requires --lang en", err=True)
+        raise SystemExit(1)
+    try:
+        index = KeywordIndex.load(index_path) if index_path else None
+    except ValueError as e:
+        click.echo(f"Error: {e}", err=True)
+        raise SystemExit(1)
+    try:
+        results = extract_keywords(text_input, lang=lang, mode=mode, top_k=top, index=index)
+    finally:
+        if index is not None:
+            index.close()
     for kw in results:
         click.echo(f"  {kw['word']:<20} boost={kw['boost']:.2f}")
 
 
+@text.command("keyword-index")
+@click.argument("corpus")
+@click.option("--field", default=None, help="Text field of JSONL records (default: one document per line)")
+@click.option("-o", "--output", default="keywords.idx", help="Output index file")
+def text_keyword_index(corpus, field, output):
+    """Build an English TF-IDF keyword index from a corpus file."""
+    import json
+    from devkit.text.keywords import KeywordIndex
+
+    def documents():
+        with open(corpus, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                if field:
+                    yield json.loads(line).get(field) or ""
+                else:
+                    yield line
+
+    index = KeywordIndex.build(documents())
+    index.save(output)
+    click.echo(f"Indexed {index.n_docs} documents, {len(index)} terms -> {output}")
+
+
 @text.command("split")
 @click.argument("text_input")
 @click.option("--criterion", default="coarse", type=click.Choice(["coarse", "fine"]))
-def text_split(text_input, criterion):
+@click.option("--bulk", is_flag=True, help="Split every document of a directory or JSONL file into JSONL records")
+@click.option("--field", default="text", help="Text field of JSONL records (--bulk)")
+@click.option("--id-field", default="id", help="Document id field of JSONL records (--bulk)")
+@click.option("--extensions", default="txt,md", help="Comma-separated extensions for directories (--bulk)")
+@click.option("--workers", default=1, type=int, help="Worker processes (--bulk)")
+@click.option("-o", "--output", default="sentences.jsonl", help="Output JSONL file (--bulk)")
+def text_split(text_input, criterion, bulk, field, id_field, extensions, workers, output):
     """Split text into sentences."""
-    from devkit.text.split_sentence import split_sentence
+    from devkit.text.split_sentence import iter_sentences, split_sentence
+    if bulk:
+        import time
+        from devkit.text.split_sentence import split_corpus
+        start = time.perf_counter()
+
+        def report(docs, sentences):
+            rate = docs / max(time.perf_counter() - start, 1e-9)
+            click.echo(f"  {docs} docs, {sentences} sentences ({rate:.0f} docs/s)", err=True)
+
+        ext_list = [e.strip() for e in extensions.split(",")]
+        docs, sentences = split_corpus(text_input, output, criterion=criterion, workers=workers, field=field,
+                                       id_field=id_field, extensions=ext_list, progress=report)
+        elapsed = time.perf_counter() - start
+        click.echo(f"Split {docs} docs into {sentences} sentences in {elapsed:.1f}s "
+                   f"({docs / max(elapsed, 1e-9):.0f} docs/s) -> {output}")
+        return
     if os.path.isfile(text_input):
         with open(text_input, "r", encoding="utf-8") as f:
-            text_input = f.read()
+            for i, s in enumerate(iter_sentences(f, criterion=criterion), 1):
+                click.echo(f"  [{i}] {s}")
+        return
     sentences = split_sentence(text_input, criterion=criterion)
     for i, s in enumerate(sentences, 1):
         click.echo(f"  [{i}] {s}")
@@ -268,22 +386,108 @@ def ai():
 @click.argument("text_or_file")
 @click.option("--model", default="gpt-4o", help="Model name for tokenization")
 @click.option("--file", "is_file", is_flag=True, help="Treat input as file path")
-def ai_tokens(text_or_file, model, is_file):
+@click.option("--jsonl", "is_jsonl", is_flag=True, help="Count tokens per record of a JSONL file")
+@click.option("--field", default="text", help="Record text field (--jsonl)")
+@click.option("-o", "--output", default=None, help="Write per-record counts, one per line (--jsonl)")
+@click.option("--method", default="exact", type=click.Choice(["exact", "approx", "auto"]),
+              help="approx estimates without tiktoken; auto falls back to it when tiktoken is unavailable")
+@click.option("--dir", "is_dir", is_flag=True, help="Count every matching file under a directory, with input cost")
+@click.option("--extensions", default=None, help="Comma-separated file extensions (--dir, default: code files)")
+@click.option("--workers", default=1, type=int, help="Worker processes (--dir)")
+@click.option("--cache", "use_cache", is_flag=True, help="Reuse counts of unchanged inputs from ~/.devkit/token_cache.sqlite3")
+def ai_tokens(text_or_file, model, is_file, is_jsonl, field, output, method, is_dir, extensions, workers, use_cache):
     """Count tokens for LLM models."""
     from devkit.ai.token_counter import count_tokens, count_tokens_file
+    if use_cache:
+        from devkit.ai.token_cache import get_token_cache
+
+        @click.get_current_context().call_on_close
+        def report_cache():
+            cache = get_token_cache()
+            cache.flush_stats()
+            stats = cache.stats()
+            click.echo(f"Cache totals: {stats['hits']} hits, {stats['misses']} misses "
+                       f"({stats['hit_rate']:.0%}), {stats['entries']} entries", err=True)
+    if is_dir:
+        from devkit.ai.cost_calculator import calculate_cost
+        from devkit.ai.token_counter import count_tokens_dir
+
+        def fmt_cost(tokens):
+            cost = calculate_cost(model, tokens, 0)
+            return "n/a" if cost is None else f"${cost:.6f}"
+
+        ext_list = [e.strip() for e in extensions.split(",")] if extensions else None
+        files = total = skipped = 0
+        for rel_path, count in count_tokens_dir(text_or_file, model=model, extensions=ext_list,
+                                                workers=workers, method=method, cache=use_cache):
+            if count is None:
+                skipped += 1
+                click.echo(f"  {'skipped':>10}  {'':>12}  {rel_path}")
+                continue
+            files += 1
+            total += count
+            click.echo(f"  {count:>10}  {fmt_cost(count):>12}  {rel_path}")
+        click.echo(f"Total ({model}): {total} tokens in {files} files, input cost {fmt_cost(total)}"
+                   + (f" ({skipped} unreadable files skipped)" if skipped else ""))
+        return
+    if is_jsonl:
+        import time
+        from devkit.ai.token_counter import iter_record_tokens
+        start = time.perf_counter()
+        records = total = 0
+        out = open(output, "w", encoding="utf-8") if output else None
+        try:
+            for count in iter_record_tokens(text_or_file, field=field, model=model, method=method):
+                records += 1
+                total += count
+                if out is not None:
+                    out.write(f"{count}\n")
+                if records % 10000 == 0:
+                    elapsed = max(time.perf_counter() - start, 1e-9)
+                    click.echo(f"  {records} records, {total} tokens "
+                               f"({records / elapsed:.0f} records/s, {total / elapsed:.0f} tokens/s)", err=True)
+        finally:
+            if out is not None:
+                out.close()
+        click.echo(f"Tokens ({model}): {total} in {records} records")
+        return
     if is_file:
-        count = count_tokens_file(text_or_file, model=model)
+        count = count_tokens_file(text_or_file, model=model, method=method, cache=use_cache)
     else:
-        count = count_tokens(text_or_file, model=model)
-    click.echo(f"Tokens ({model}): {count}")
+        count = count_tokens(text_or_file, model=model, method=method, cache=use_cache)
+    approx = "~" if method == "approx" else ""
+    click.echo(f"Tokens ({model}): {approx}{count}")
 
 
 @ai.command("cost")
-@click.option("--model", required=True, help="Model name")
-@click.option("--input-tokens", required=True, type=int, help="Input token count")
-@click.option("--output-tokens", required=True, type=int, help="Output token count")
-def ai_cost(model, input_tokens, output_tokens):
+@click.option("--model", default=None, help="Model name (with --log: for records without one)")
+@click.option("--input-tokens", default=None, type=int, help="Input token count")
+@click.option("--output-tokens", default=None, type=int, help="Output token count")
+@click.option("--log", "log_file", default=None, type=click.Path(exists=True),
+              help="CSV or JSONL usage log to total by model")
+@click.option("--model-field", default="model", help="Log field holding the model name")
+@click.option("--input-field", default="input_tokens", help="Log field holding input tokens")
+@click.option("--output-field", default="output_tokens", help="Log field holding output tokens")
+def ai_cost(model, input_tokens, output_tokens, log_file, model_field, input_field, output_field):
     """Estimate API cost."""
+    if log_file:
+        from devkit.ai.cost_calculator import summarize_usage_log
+        summary = summarize_usage_log(
+            log_file, model_field=model_field, input_field=input_field,
+            output_field=output_field, default_model=model,
+        )
+        total = 0.0
+        for name, row in summary.items():
+            cost = "unknown model" if row["cost"] is None else f"${row['cost']:.6f}"
+            click.echo(f"  {name:<20} {row['requests']:>10} requests {row['input_tokens']:>14} in "
+                       f"{row['output_tokens']:>14} out  {cost}")
+            total += row["cost"] or 0.0
+        requests = sum(row["requests"] for row in summary.values())
+        click.echo(f"Total: ${total:.6f} for {requests} requests")
+        return
+    if model is None or input_tokens is None or output_tokens is None:
+        click.echo("Error: --model, --input-tokens and --output-tokens are required without --log", err=True)
+        raise SystemExit(1)
     from devkit.ai.cost_calculator import calculate_cost
     cost = calculate_cost(model, input_tokens, output_tokens)
     if cost is None:
@@ -307,31 +511,87 @@ def ai_cost_compare(input_tokens, output_tokens):
 @ai.command("prompt")
 @click.argument("name")
 @click.option("--vars", "variables", default=None, help="JSON variables for rendering")
+@click.option("--vars-jsonl", default=None, type=click.Path(exists=True),
+              help="Render once per JSONL variables record")
+@click.option("--tokens", "with_tokens", is_flag=True, help="Add each prompt's token count (--vars-jsonl)")
+@click.option("--model", default="gpt-4o", help="Model for --tokens")
+@click.option("--workers", default=1, type=int, help="Worker processes (--vars-jsonl)")
+@click.option("-o", "--output", default=None, help="Output JSONL file (--vars-jsonl)")
 @click.option("--save", "content", default=None, help="Save content as template")
 @click.option("--list", "list_all", is_flag=True, help="List all templates")
-def ai_prompt(name, variables, content, list_all):
+@click.option("--store", "store_path", default=None, help="Use a template store file instead of ~/.devkit/prompts")
+def ai_prompt(name, variables, vars_jsonl, with_tokens, model, workers, output, content, list_all, store_path):
     """Manage prompt templates."""
     import json as json_mod
     from devkit.ai.prompt_template import render_template, save_template, load_template, list_templates
-    if list_all:
+    if store_path:
+        from devkit.ai.template_store import TemplateStore
+        with TemplateStore(store_path) as store:
+            if list_all:
+                for t in store.names():
+                    click.echo(f"  {t}")
+                return
+            if content:
+                store.save(name, content)
+                click.echo(f"Template saved: {name} ({store_path})")
+                return
+            template = store.load(name)
+    elif list_all:
         for t in list_templates():
             click.echo(f"  {t}")
         return
-    if content:
+    elif content:
         path = save_template(name, content)
         click.echo(f"Template saved: {path}")
         return
-    template = load_template(name)
+    else:
+        template = load_template(name)
     if template is None:
         click.echo(f"Template not found: {name}", err=True)
         raise SystemExit(1)
-    if variables:
+    if vars_jsonl:
+        from devkit.ai.prompt_template import write_rendered_prompts
+        if output is None:
+            output = _derived_path(vars_jsonl, ".prompts.jsonl")
+        errors = []
+        count = write_rendered_prompts(template, vars_jsonl, output, model=model if with_tokens else None,
+                                       workers=workers, on_invalid="skip", errors=errors)
+        click.echo(f"Wrote {count} prompts to {output}")
+        if errors:
+            click.echo(f"Skipped {len(errors)} invalid records:", err=True)
+            for line_no, reason in errors[:10]:
+                click.echo(f"  line {line_no}: {reason}", err=True)
+            if len(errors) > 10:
+                click.echo(f"  ... and {len(errors) - 10} more", err=True)
+    elif variables:
         vars_dict = json_mod.loads(variables)
         click.echo(render_template(template, vars_dict))
     else:
         click.echo(template)
 
 
+@ai.command("prompt-store")
+@click.argument("action", type=click.Choice(["import", "export", "list"]))
+@click.argument("directory", required=False)
+@click.option("--store", "store_path", default=None, help="Template store file (default: ~/.devkit/prompts.sqlite3)")
+def ai_prompt_store(action, directory, store_path):
+    """Import/export a prompts directory (<name>.txt files) to/from a template store."""
+    from devkit.ai.prompt_template import DEFAULT_PROMPTS_DIR
+    from devkit.ai.template_store import TemplateStore
+    directory = directory or DEFAULT_PROMPTS_DIR
+    with TemplateStore(store_path) as store:
+        if action == "list":
+            for t in store.names():
+                click.echo(f"  {t}")
+        elif action == "import":
+            if not os.path.isdir(directory):
+                click.echo(f"Error: not a directory: {directory}", err=True)
+                raise SystemExit(1)
+            click.echo(f"Imported {store.import_dir(directory)} templates into {store.path}")
+        else:
+            click.echo(f"Exported {store.export_dir(directory)} templates to {directory}")
+
+
 @cli.group()
 def data():
     """Data processing tools."""
@@ -343,13 +603,23 @@ def data():
 @data.command("json-flatten")
 @click.argument("input_file")
 @click.option("-o", "--output", default=None, help="Output file")
-def data_json_flatten(input_file, output):
+@click.option("--jsonl", "is_jsonl", is_flag=True, help="Flatten every record of a JSONL file, streaming")
+@click.option("--lists", is_flag=True, help="Also flatten lists, with element indices as keys")
+@click.option("--separator", default=".", help="Key separator")
+def data_json_flatten(input_file, output, is_jsonl, lists, separator):
     """Flatten nested JSON to dot-notation keys."""
     import json as json_mod
     from devkit.data.json_utils import flatten_json
+    if is_jsonl:
+        from devkit.data.json_utils import flatten_jsonl
+        if output is None:
+            output = _derived_path(input_file, ".flat.jsonl")
+        count = flatten_jsonl(input_file, output, separator, lists=lists)
+        click.echo(f"Wrote {count} records to {output}")
+        return
     with open(input_file, "r", encoding="utf-8") as f:
         original = json_mod.load(f)
-    result = flatten_json(original)
+    result = flatten_json(original, separator, lists=lists)
     out = json_mod.dumps(result, indent=2, ensure_ascii=False)
     if output:
         with open(output, "w", encoding="utf-8") as f:
@@ -359,6 +629,35 @@ def data_json_flatten(input_file, output):
         click.echo(out)
 
 
+@data.command("json-unflatten")
+@click.argument("input_file")
+@click.option("-o", "--output", default=None, help="Output file")
+@click.option("--jsonl", "is_jsonl", is_flag=True, help="Unflatten every record of a JSONL file, streaming")
+@click.option("--lists", is_flag=True, help="Restore lists from element-index keys")
+@click.option("--separator", default=".", help="Key separator")
+def data_json_unflatten(input_file, output, is_jsonl, lists, separator):
+    """Rebuild nested JSON from dot-notation keys."""
+    import json as json_mod
+    from devkit.data.json_utils import unflatten_json
+    if is_jsonl:
+        from devkit.data.json_utils import unflatten_jsonl
+        if output is None:
+            output = _derived_path(input_file, ".nested.jsonl")
+        count = unflatten_jsonl(input_file, output, separator, lists=lists)
+        click.echo(f"Wrote {count} records to {output}")
+        return
+    with open(input_file, "r", encoding="utf-8") as f:
+        original = json_mod.load(f)
+    result = unflatten_json(original, separator, lists=lists)
+    out = json_mod.dumps(result, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(out)
+        click.echo(f"Unflattened JSON written to {output}")
+    else:
+        click.echo(out)
+
+
 @data.command("json-merge")
 @click.argument("files", nargs=-1, required=True)
 @click.option("-o", "--output", required=True, help="Output JSONL file")
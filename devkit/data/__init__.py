@@ -1,4 +1,4 @@
 """Data processing tools."""
 
-from devkit.data.json_utils import flatten_json, unflatten_json, json_query, merge_jsonl
+from devkit.data.json_utils import flatten_json, flatten_jsonl, unflatten_json, unflatten_jsonl, json_query, merge_jsonl
 from devkit.data.csv_utils import merge_csvs, split_csv, csv_to_json, json_to_csv
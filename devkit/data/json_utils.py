@@ -1,23 +1,55 @@
 """JSON processing utilities."""
 
+import json
 import os
 from typing import Any, Optional
 
 
-def flatten_json(data: dict, separator: str = ".", prefix: str = "") -> dict:
-    """Flatten a nested dict into a single-level dict with dotted keys."""
+def flatten_json(data: dict, separator: str = ".", prefix: str = "", lists: bool = False) -> dict:
+    """Flatten a nested dict into a single-level dict with dotted keys.
+
+    Iterative: nesting depth is not limited by the recursion limit, and
+    values are written straight into one output dict in depth-first order.
+
+    Args:
+        data: Nested dict.
+        separator: Key separator.
+        prefix: Prefix for all keys.
+        lists: Also flatten non-empty lists, using element indices as keys.
+
+    Returns:
+        Flat dict.
+    """
     result = {}
-    for key, value in data.items():
-        new_key = f"{prefix}{separator}{key}" if prefix else key
-        if isinstance(value, dict):
-            result.update(flatten_json(value, separator, new_key))
-        else:
+    stack = [(prefix, iter(data.items()))]
+    while stack:
+        prefix, items = stack[-1]
+        for key, value in items:
+            new_key = f"{prefix}{separator}{key}" if prefix else key
+            if isinstance(value, dict):
+                stack.append((new_key, iter(value.items())))
+                break
+            if lists and value and isinstance(value, list):
+                stack.append((new_key, enumerate(value)))
+                break
             result[new_key] = value
+        else:
+            stack.pop()
     return result
 
 
-def unflatten_json(data: dict, separator: str = ".") -> dict:
-    """Unflatten a dotted-key dict into a nested dict."""
+def unflatten_json(data: dict, separator: str = ".", lists: bool = False) -> dict:
+    """Unflatten a dotted-key dict into a nested dict.
+
+    Args:
+        data: Flat dict.
+        separator: Key separator.
+        lists: Turn nested objects whose keys are exactly "0".."n-1" back
+            into lists (the inverse of flatten_json(..., lists=True)).
+
+    Returns:
+        Nested dict.
+    """
     result: dict = {}
     for compound_key, value in data.items():
         keys = compound_key.split(separator)
@@ -27,9 +59,24 @@ def unflatten_json(data: dict, separator: str = ".") -> dict:
                 current[key] = {}
             current = current[key]
         current[keys[-1]] = value
+    if lists:
+        _restore_lists(result)
     return result
 
 
+def _restore_lists(root: dict) -> None:
+    """Replace nested dicts keyed "0".."n-1" with lists, innermost first."""
+    nodes = [(root, key, value) for key, value in root.items() if isinstance(value, dict)]
+    i = 0
+    while i < len(nodes):
+        node = nodes[i][2]
+        nodes.extend((node, key, value) for key, value in node.items() if isinstance(value, dict))
+        i += 1
+    for parent, key, node in reversed(nodes):
+        if node and all(k == str(index) for index, k in enumerate(node)):
+            parent[key] = list(node.values())
+
+
 def json_query(data: Any, path: str, separator: str = ".") -> Optional[Any]:
     """Query a nested dict using dot-notation path."""
     keys = path.split(separator)
@@ -52,3 +99,51 @@ def merge_jsonl(files: list, output: str) -> None:
                     line = line.strip()
                     if line:
                         out.write(line + "\n")
+
+
+def _transform_jsonl(input_path: str, output_path: str, transform) -> int:
+    """Apply transform to every JSON object line; other lines pass through unchanged."""
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    decode = json.JSONDecoder().decode
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    count = 0
+    with open(input_path, "r", encoding="utf-8") as f, open(output_path, "w", encoding="utf-8") as out:
+        for line in f:
+            if not line.strip():
+                continue
+            record = decode(line)
+            if isinstance(record, dict):
+                record = transform(record)
+            out.write(encode(record) + "\n")
+            count += 1
+    return count
+
+
+def flatten_jsonl(input_path: str, output_path: str, separator: str = ".", lists: bool = False) -> int:
+    """Flatten every record of a JSONL file, streaming with constant memory.
+
+    Args:
+        input_path: Input JSONL file.
+        output_path: Output JSONL file.
+        separator: Key separator.
+        lists: Also flatten lists, as in flatten_json.
+
+    Returns:
+        Number of records written.
+    """
+    return _transform_jsonl(input_path, output_path, lambda r: flatten_json(r, separator, lists=lists))
+
+
+def unflatten_jsonl(input_path: str, output_path: str, separator: str = ".", lists: bool = False) -> int:
+    """Unflatten every record of a JSONL file, streaming with constant memory.
+
+    Args:
+        input_path: Input JSONL file.
+        output_path: Output JSONL file.
+        separator: Key separator.
+        lists: Restore lists, as in unflatten_json.
+
+    Returns:
+        Number of records written.
+    """
+    return _transform_jsonl(input_path, output_path, lambda r: unflatten_json(r, separator, lists=lists))
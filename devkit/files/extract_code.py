@@ -1,7 +1,7 @@
 """Extract and merge source code files."""
 
 import os
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 
 DEFAULT_EXTENSIONS = ["py", "js", "ts", "html", "css", "java", "go", "rs", "c", "cpp", "h"]
 
@@ -13,26 +13,42 @@ LANG_MAP = {
 }
 
 
-def extract_code_files(directory: str, extensions: Optional[List[str]] = None, output: Optional[str] = None) -> str:
-    """Extract code files from a directory into a single document."""
+def iter_code_files(directory: str, extensions: Optional[List[str]] = None) -> Iterator[Tuple[str, str]]:
+    """Walk a directory for files with the given extensions.
+
+    Args:
+        directory: Root directory.
+        extensions: Extensions without dots (default: DEFAULT_EXTENSIONS).
+
+    Yields:
+        (path, path relative to directory), in sorted walk order.
+    """
     if extensions is None:
         extensions = DEFAULT_EXTENSIONS
     ext_set = set(extensions)
-    parts = []
-    for root, _, files in os.walk(directory):
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
         for filename in sorted(files):
             ext = filename.rsplit(".", 1)[-1] if "." in filename else ""
             if ext not in ext_set:
                 continue
             filepath = os.path.join(root, filename)
-            rel_path = os.path.relpath(filepath, directory)
-            lang = LANG_MAP.get(ext, "")
-            try:
-                with open(filepath, "r", encoding="utf-8", errors="replace") as f:
-                    content = f.read()
-            except (PermissionError, OSError):
-                continue
-            parts.append(f"{rel_path}\n```{lang}\n{content}\n```\n")
+            yield filepath, os.path.relpath(filepath, directory)
+
+
+def extract_code_files(directory: str, extensions: Optional[List[str]] = None, output: Optional[str] = None) -> str:
+    """Extract code files from a directory into a single document."""
+    parts = []
+    for filepath, rel_path in iter_code_files(directory, extensions):
+        filename = os.path.basename(filepath)
+        ext = filename.rsplit(".", 1)[-1] if "." in filename else ""
+        lang = LANG_MAP.get(ext, "")
+        try:
+            with open(filepath, "r", encoding="utf-8", errors="replace") as f:
+                content = f.read()
+        except (PermissionError, OSError):
+            continue
+        parts.append(f"{rel_path}\n```{lang}\n{content}\n```\n")
     result = "\n".join(parts)
     if output:
         os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
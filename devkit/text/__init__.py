@@ -1,5 +1,5 @@
 """Text & NLP processing tools."""
 
 from devkit.text.text_length import calculate_custom_length
-from devkit.text.split_sentence import split_sentence
-from devkit.text.tokenizer import word_tokenize, char_count
+from devkit.text.split_sentence import SentenceSplitter, iter_sentences, split_sentence
+from devkit.text.tokenizer import word_tokenize, char_count, analyze_text, analyze_texts, iter_tokens, iter_file_tokens
@@ -0,0 +1,145 @@
+"""Trending keywords over a sliding window of a text stream.
+
+Terms are counted in count-min sketches, one per slice of the window, so
+memory is fixed by the sketch size and candidate capacity regardless of
+window length or vocabulary. When the oldest slice expires its sketch is
+subtracted from the running total in one pass.
+"""
+
+import heapq
+import math
+import zlib
+from array import array
+from collections import deque
+from typing import Dict, Iterable, List, Set, Union
+
+from devkit.text.keywords import _ZH_ALLOW_POS, _english_terms, _get_analyse
+
+
+def _document_terms(text: str, lang: str) -> Set[str]:
+    """Distinct candidate keywords of one document."""
+    if lang == "en":
+        return set(_english_terms(text))
+    analyse = _get_analyse()
+    return set(analyse.extract_tags(text, topK=None, allowPOS=_ZH_ALLOW_POS))
+
+
+class KeywordTracker:
+    """Approximate document counts of keywords over the last `window` documents.
+
+    Each document counts at most once per term. Counts are count-min
+    estimates: never below the true count, and exact unless terms collide
+    in every row of the sketch.
+
+    Args:
+        window: Number of most recent documents to count over.
+        slices: Window granularity; documents expire slices at a time, so the
+            window covers between window - window/slices + 1 and window documents
+            once it has filled.
+        capacity: Number of candidate terms kept for top().
+        width: Counters per sketch row.
+        depth: Sketch rows (independent hashes).
+        lang: Language for term extraction ('en' or 'zh').
+    """
+
+    def __init__(
+        self,
+        window: int = 10000,
+        slices: int = 10,
+        capacity: int = 1000,
+        width: int = 1 << 14,
+        depth: int = 4,
+        lang: str = "en",
+    ):
+        if window < 1 or slices < 1 or capacity < 1 or width < 1 or depth < 1:
+            raise ValueError("window, slices, capacity, width and depth must be positive")
+        if lang not in ("en", "zh"):
+            raise ValueError("lang must be 'en' or 'zh'")
+        self.lang = lang
+        self.capacity = capacity
+        self.width = width
+        self.depth = depth
+        self._slice_size = math.ceil(window / slices)
+        self._slices = slices
+        self._total = self._new_sketch()
+        self._current = self._new_sketch()
+        self._current_docs = 0
+        self._expiring: deque = deque()  # (sketch, n_docs) of full slices, oldest first
+        self._candidates: Dict[str, int] = {}
+
+    def _new_sketch(self) -> array:
+        return array("q", [0]) * (self.width * self.depth)
+
+    def _cells(self, term: str) -> List[int]:
+        data = term.encode("utf-8")
+        h1 = zlib.crc32(data)
+        h2 = zlib.crc32(data, 0x9E3779B9) | 1
+        width = self.width
+        return [(h1 + i * h2) % width + i * width for i in range(self.depth)]
+
+    @property
+    def n_docs(self) -> int:
+        """Number of documents currently in the window."""
+        return self._current_docs + sum(n for _, n in self._expiring)
+
+    def add(self, text: str) -> None:
+        """Count the keywords of one incoming document."""
+        self.add_terms(_document_terms(str(text), self.lang))
+
+    def add_terms(self, terms: Iterable[str]) -> None:
+        """Count one incoming document given its (already extracted) terms."""
+        if self._current_docs >= self._slice_size:
+            self._rotate()
+        total, current, candidates = self._total, self._current, self._candidates
+        for term in set(terms):
+            estimate = None
+            for cell in self._cells(term):
+                current[cell] += 1
+                total[cell] += 1
+                if estimate is None or total[cell] < estimate:
+                    estimate = total[cell]
+            candidates[term] = estimate
+        if len(candidates) > 2 * self.capacity:
+            self._prune()
+        self._current_docs += 1
+
+    def count(self, term: str) -> int:
+        """Estimated number of documents in the window containing term."""
+        total = self._total
+        return min(total[cell] for cell in self._cells(term))
+
+    def top(self, k: int = 10) -> List[Dict[str, Union[str, int]]]:
+        """Return the k terms found in the most documents of the window.
+
+        Args:
+            k: Number of terms.
+
+        Returns:
+            List of dicts with 'word' and 'count' keys, most frequent first.
+        """
+        best = heapq.nlargest(k, self._candidates.items(), key=lambda item: item[1])
+        return [{"word": word, "count": count} for word, count in best]
+
+    def _prune(self) -> None:
+        """Keep the `capacity` candidates with the highest estimates."""
+        self._candidates = dict(heapq.nlargest(self.capacity, self._candidates.items(), key=lambda item: item[1]))
+
+    def _rotate(self) -> None:
+        """Close the current slice, expiring the oldest one if the window is full."""
+        self._expiring.append((self._current, self._current_docs))
+        self._current = self._new_sketch()
+        self._current_docs = 0
+        if len(self._expiring) < self._slices:
+            return
+        oldest, _ = self._expiring.popleft()
+        self._total = total = array("q", map(int.__sub__, self._total, oldest))
+        # Expired documents lower the estimates: refresh candidates and drop
+        # terms that left the window entirely.
+        refreshed = {}
+        for term in self._candidates:
+            estimate = min(total[cell] for cell in self._cells(term))
+            if estimate > 0:
+                refreshed[term] = estimate
+        self._candidates = refreshed
+        if len(refreshed) > self.capacity:
+            self._prune()
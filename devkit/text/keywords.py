@@ -3,11 +3,35 @@
 Requires: jieba (pip install devkit-tools[nlp])
 """
 
-from typing import Dict, List, Union
+import json
+import math
+import mmap
+import os
+import re
+import struct
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from devkit.utils import parallel_map
+
+_EN_WORD_PATTERN = re.compile(r"\b[a-zA-Z]{2,}\b")
+_EN_STOP_WORDS = frozenset({
+    "the", "a", "an", "is", "are", "was", "were", "be", "been",
+    "being", "have", "has", "had", "do", "does", "did", "will",
+    "would", "could", "should", "may", "might", "can", "shall",
+    "of", "in", "to", "for", "with", "on", "at", "from", "by",
+    "as", "into", "through", "during", "before", "after", "and",
+    "but", "or", "nor", "not", "so", "yet", "both", "either",
+    "neither", "each", "every", "all", "any", "few", "more",
+    "most", "other", "some", "such", "no", "only", "own", "same",
+    "than", "too", "very", "just", "because", "this", "that",
+    "these", "those", "it", "its",
+})
 
 
 def extract_keywords(
-    text: str, lang: str = "zh", mode: str = "all", top_k: int = 10
+    text: str, lang: str = "zh", mode: str = "all", top_k: int = 10,
+    index: Optional["KeywordIndex"] = None,
 ) -> List[Dict[str, Union[str, float]]]:
     """Extract weighted keywords from text.
 
@@ -16,40 +40,78 @@ def extract_keywords(
         lang: Language ('zh' for Chinese, 'en' for English).
         mode: 'all' to keep all, 'filter' to remove overlapping keywords.
         top_k: Maximum keywords to return.
+        index: Optional KeywordIndex (English only) to score by TF-IDF
+            against a corpus instead of raw term frequency.
 
     Returns:
         List of dicts with 'word' and 'boost' keys.
     """
+    if index is not None and lang != "en":
+        raise ValueError("index is only supported for lang='en'")
     text = str(text).strip()
     if not text:
         return []
 
+    if mode not in ("all", "filter"):
+        raise ValueError("mode must be 'all' or 'filter'")
     if lang == "en":
-        return _extract_english(text, top_k)
+        return _extract_english(text, mode, top_k, index)
     return _extract_chinese(text, mode, top_k)
 
 
-def _extract_english(text: str, top_k: int) -> List[Dict[str, Union[str, float]]]:
-    """Simple English keyword extraction using word frequency."""
-    import re
-    words = re.findall(r"\b[a-zA-Z]{2,}\b", text.lower())
-    stop_words = {"the", "a", "an", "is", "are", "was", "were", "be", "been",
-                  "being", "have", "has", "had", "do", "does", "did", "will",
-                  "would", "could", "should", "may", "might", "can", "shall",
-                  "of", "in", "to", "for", "with", "on", "at", "from", "by",
-                  "as", "into", "through", "during", "before", "after", "and",
-                  "but", "or", "nor", "not", "so", "yet", "both", "either",
-                  "neither", "each", "every", "all", "any", "few", "more",
-                  "most", "other", "some", "such", "no", "only", "own", "same",
-                  "than", "too", "very", "just", "because", "this", "that",
-                  "these", "those", "it", "its"}
-    words = [w for w in words if w not in stop_words]
-
-    freq: Dict[str, int] = {}
-    for w in words:
+def _english_terms(text: str) -> List[str]:
+    """Lowercased English words of two or more letters, minus stop words."""
+    return [w for w in _EN_WORD_PATTERN.findall(text.lower()) if w not in _EN_STOP_WORDS]
+
+
+def _drop_overlapping(ranked: List[Tuple[str, float]], top_k: int) -> List[Tuple[str, float]]:
+    """Keep the top_k best words that neither contain nor sit inside a better kept word.
+
+    Instead of comparing every pair of words, each kept word registers its
+    substrings of the candidate lengths in a set, and each candidate checks
+    its own substrings against the kept words, so the cost is linear in the
+    number of candidates.
+    """
+    lengths = sorted({len(word) for word, _ in ranked})
+    kept: List[Tuple[str, float]] = []
+    kept_words = set()
+    kept_lengths = set()
+    inside_kept = set()
+    for word, weight in ranked:
+        size = len(word)
+        if word in inside_kept:
+            continue
+        if any(word[i:i + n] in kept_words
+               for n in kept_lengths if n < size
+               for i in range(size - n + 1)):
+            continue
+        kept.append((word, weight))
+        if len(kept) >= top_k:
+            break
+        kept_words.add(word)
+        kept_lengths.add(size)
+        for n in lengths:
+            if n >= size:
+                break
+            inside_kept.update(word[i:i + n] for i in range(size - n + 1))
+    return kept
+
+
+def _extract_english(
+    text: str, mode: str, top_k: int, index: Optional["KeywordIndex"] = None
+) -> List[Dict[str, Union[str, float]]]:
+    """English keyword extraction using word frequency, or TF-IDF with an index."""
+    freq: Dict[str, float] = {}
+    for w in _english_terms(text):
         freq[w] = freq.get(w, 0) + 1
 
+    if index is not None:
+        idf = index.idf
+        freq = {w: c * idf(w) for w, c in freq.items()}
+
     sorted_words = sorted(freq.items(), key=lambda x: -x[1])
+    if mode == "filter":
+        sorted_words = _drop_overlapping(sorted_words, top_k)
     max_freq = sorted_words[0][1] if sorted_words else 1
     return [
         {"word": w, "boost": round(c / max_freq * 2, 2)}
@@ -57,17 +119,49 @@ def _extract_english(text: str, top_k: int) -> List[Dict[str, Union[str, float]]
     ]
 
 
+_ZH_ALLOW_POS = ("n", "ns", "nt", "nz", "v", "vn", "a", "an", "eng")
+_analyse = None
+
+
+def _get_analyse():
+    """Import jieba.analyse once per process."""
+    global _analyse
+    if _analyse is None:
+        try:
+            import jieba.analyse as analyse
+        except ImportError:
+            raise ImportError("jieba is required: pip install devkit-tools[nlp]")
+        _analyse = analyse
+    return _analyse
+
+
+def init_jieba(cache_file: Optional[str] = None) -> None:
+    """Load jieba's dictionary now instead of on the first extraction.
+
+    Args:
+        cache_file: Optional path of jieba's serialized dictionary cache. It is
+            read if present and written by the first load otherwise, so later
+            processes skip parsing the dictionary text. Has no effect once
+            jieba is already initialized in this process.
+    """
+    _get_analyse()
+    import jieba
+    if cache_file:
+        jieba.dt.cache_file = os.path.abspath(cache_file)
+    jieba.initialize()
+
+
 def _extract_chinese(
     text: str, mode: str, top_k: int
 ) -> List[Dict[str, Union[str, float]]]:
     """Chinese keyword extraction using jieba TF-IDF."""
-    try:
-        import jieba.analyse as analyse
-    except ImportError:
-        raise ImportError("jieba is required: pip install devkit-tools[nlp]")
-
-    allow_pos = ("n", "ns", "nt", "nz", "v", "vn", "a", "an", "eng")
-    extracted = analyse.extract_tags(text, topK=top_k, withWeight=True, allowPOS=allow_pos)
+    analyse = _get_analyse()
+    if mode == "filter":
+        # Rank every candidate so words dropped as overlaps are replaced.
+        extracted = analyse.extract_tags(text, topK=None, withWeight=True, allowPOS=_ZH_ALLOW_POS)
+        extracted = _drop_overlapping(extracted, top_k)
+    else:
+        extracted = analyse.extract_tags(text, topK=top_k, withWeight=True, allowPOS=_ZH_ALLOW_POS)
 
     if not extracted:
         return [{"word": text, "boost": 2.0}]
@@ -77,3 +171,231 @@ def _extract_chinese(
         {"word": word, "boost": round(weight / max_weight * 2, 2)}
         for word, weight in extracted
     ]
+
+
+def _init_worker(lang: str, cache_file: Optional[str]) -> None:
+    if lang == "zh":
+        init_jieba(cache_file)
+
+
+def _pool_map(func, items, lang, cache_file, workers, chunk_size):
+    # Load jieba in the parent first: forked workers inherit the loaded
+    # dictionary and spawned ones find the cache already written.
+    if workers > 1:
+        _init_worker(lang, cache_file)
+    return parallel_map(func, items, workers=workers, chunk_size=chunk_size,
+                        initializer=_init_worker, initargs=(lang, cache_file))
+
+
+def _keywords_task(text: str, lang: str, mode: str, top_k: int) -> List[Dict[str, Union[str, float]]]:
+    return extract_keywords(text, lang=lang, mode=mode, top_k=top_k)
+
+
+def extract_keywords_batch(
+    texts: Iterable[str],
+    lang: str = "zh",
+    mode: str = "all",
+    top_k: int = 10,
+    workers: int = 1,
+    cache_file: Optional[str] = None,
+    chunk_size: int = 64,
+) -> Iterator[List[Dict[str, Union[str, float]]]]:
+    """Extract keywords from many texts across a process pool.
+
+    jieba is initialized once up front and in each worker (see init_jieba)
+    rather than on the first text each worker happens to receive.
+
+    Args:
+        texts: Iterable of input texts.
+        lang: Language ('zh' or 'en').
+        mode: 'all' or 'filter', as in extract_keywords.
+        top_k: Maximum keywords per text.
+        workers: Number of worker processes.
+        cache_file: Optional jieba dictionary cache path (see init_jieba).
+        chunk_size: Texts sent to a worker per task.
+
+    Yields:
+        The extract_keywords result for each text, in input order.
+    """
+    task = partial(_keywords_task, lang=lang, mode=mode, top_k=top_k)
+    return _pool_map(task, texts, lang, cache_file, workers, chunk_size)
+
+
+def _jsonl_line_keywords(line: str, field: str, output_field: str, lang: str, mode: str, top_k: int) -> str:
+    """Annotate one JSONL line with the keywords of its field (worker task)."""
+    record = json.loads(line)
+    value = record.get(field)
+    text = "" if value is None else str(value)
+    record[output_field] = extract_keywords(text, lang=lang, mode=mode, top_k=top_k)
+    return json.dumps(record, ensure_ascii=False)
+
+
+def write_record_keywords(
+    input_path: str,
+    output_path: str,
+    field: str = "text",
+    lang: str = "zh",
+    mode: str = "all",
+    top_k: int = 10,
+    workers: int = 1,
+    cache_file: Optional[str] = None,
+    output_field: str = "keywords",
+    chunk_size: int = 64,
+) -> int:
+    """Add extracted keywords to every record of a JSONL file.
+
+    Args:
+        input_path: Input JSONL file.
+        output_path: Output JSONL file.
+        field: Name of the text field.
+        lang: Language ('zh' or 'en').
+        mode: 'all' or 'filter', as in extract_keywords.
+        top_k: Maximum keywords per record.
+        workers: Number of worker processes.
+        cache_file: Optional jieba dictionary cache path (see init_jieba).
+        output_field: Name of the added key.
+        chunk_size: Records sent to a worker per task.
+
+    Returns:
+        Number of records written.
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    task = partial(_jsonl_line_keywords, field=field, output_field=output_field,
+                   lang=lang, mode=mode, top_k=top_k)
+    count = 0
+    with open(input_path, "r", encoding="utf-8") as f, open(output_path, "w", encoding="utf-8") as out:
+        lines = (line for line in f if line.strip())
+        for result in _pool_map(task, lines, lang, cache_file, workers, chunk_size):
+            out.write(result + "\n")
+            count += 1
+    return count
+
+
+_INDEX_MAGIC = b"DKKWIDX1"
+_INDEX_HEADER = struct.Struct("<8sQQ")
+_IDF_CACHE_SIZE = 1 << 16
+
+
+class KeywordIndex:
+    """English document frequencies of a corpus, for TF-IDF keyword scoring.
+
+    Build one with add()/build() and persist it with save(). load() maps the
+    saved file read-only: terms are looked up by binary search in place, so
+    opening even a large index costs no parsing and little memory.
+
+    File layout (little-endian): magic, document count, term count; then
+    term-count + 1 uint64 offsets into the term blob, term-count uint32
+    document frequencies, and the UTF-8 terms in sorted byte order.
+    """
+
+    def __init__(self):
+        self.n_docs = 0
+        self._df: Dict[str, int] = {}
+        self._mm: Optional[mmap.mmap] = None
+        self._n_terms = 0
+        self._offsets_at = self._dfs_at = self._blob_at = 0
+        self._idf_cache: Dict[str, float] = {}
+
+    @classmethod
+    def build(cls, texts: Iterable[str]) -> "KeywordIndex":
+        """Create an index from an iterable of documents."""
+        index = cls()
+        for text in texts:
+            index.add(text)
+        return index
+
+    def add(self, text: str) -> None:
+        """Count the distinct terms of one document."""
+        if self._mm is not None:
+            raise ValueError("cannot add documents to a loaded index")
+        df = self._df
+        for term in set(_english_terms(str(text))):
+            df[term] = df.get(term, 0) + 1
+        self.n_docs += 1
+        self._idf_cache.clear()
+
+    def __len__(self) -> int:
+        return self._n_terms if self._mm is not None else len(self._df)
+
+    def df(self, term: str) -> int:
+        """Number of documents containing term."""
+        if self._mm is None:
+            return self._df.get(term, 0)
+        return self._lookup(term.encode("utf-8"))
+
+    def idf(self, term: str) -> float:
+        """Smoothed inverse document frequency: ln((1 + N) / (1 + df)) + 1."""
+        value = self._idf_cache.get(term)
+        if value is None:
+            if len(self._idf_cache) >= _IDF_CACHE_SIZE:
+                self._idf_cache.clear()
+            value = math.log((1 + self.n_docs) / (1 + self.df(term))) + 1
+            self._idf_cache[term] = value
+        return value
+
+    def save(self, path: str) -> str:
+        """Write the index to path in the compact binary format."""
+        terms = sorted((term.encode("utf-8"), count) for term, count in self._df.items())
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, self.n_docs, len(terms)))
+            offset = 0
+            offsets = [0]
+            for term, _ in terms:
+                offset += len(term)
+                offsets.append(offset)
+            f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+            f.write(struct.pack(f"<{len(terms)}I", *(count for _, count in terms)))
+            f.write(b"".join(term for term, _ in terms))
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "KeywordIndex":
+        """Open an index written by save() via a read-only memory map.
+
+        Raises:
+            ValueError: If the file is not a keyword index or is truncated.
+        """
+        index = cls()
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < _INDEX_HEADER.size:
+                raise ValueError(f"Not a keyword index file: {path}")
+            index._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n_docs, n_terms = _INDEX_HEADER.unpack_from(index._mm, 0)
+        if magic != _INDEX_MAGIC:
+            index.close()
+            raise ValueError(f"Not a keyword index file: {path}")
+        index.n_docs = n_docs
+        index._n_terms = n_terms
+        index._offsets_at = _INDEX_HEADER.size
+        index._dfs_at = index._offsets_at + 8 * (n_terms + 1)
+        index._blob_at = index._dfs_at + 4 * n_terms
+        size = len(index._mm)
+        if size < index._blob_at or size < index._blob_at + struct.unpack_from(
+            "<Q", index._mm, index._offsets_at + 8 * n_terms
+        )[0]:
+            index.close()
+            raise ValueError(f"Truncated keyword index file: {path}")
+        return index
+
+    def close(self) -> None:
+        """Release the memory map of a loaded index."""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def _lookup(self, term: bytes) -> int:
+        mm = self._mm
+        offsets_at, blob_at = self._offsets_at, self._blob_at
+        lo, hi = 0, self._n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start, end = struct.unpack_from("<QQ", mm, offsets_at + 8 * mid)
+            candidate = mm[blob_at + start:blob_at + end]
+            if candidate < term:
+                lo = mid + 1
+            elif candidate > term:
+                hi = mid
+            else:
+                return struct.unpack_from("<I", mm, self._dfs_at + 4 * mid)[0]
+        return 0
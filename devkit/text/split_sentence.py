@@ -1,85 +1,434 @@
 """Chinese sentence splitter.
 
 Splits Chinese text into sentences with proper handling of quotation marks.
-Supports coarse (period-level) and fine (all punctuation) granularity.
+Supports coarse (period-level) and fine (all punctuation) granularity, and
+custom punctuation sets (e.g. Japanese or English) via SentenceSplitter.
 """
 
+import json
+import os
 import re
-from typing import List
+from functools import partial
+from itertools import chain
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 
-_PUNCS_FINE = {"……", "\r\n", "，", "。", ";", "；", "…", "！", "!",
-               "?", "？", "\r", "\n", "\u201c", "\u201d", "\u2018", "\u2019", "："}
-_PUNCS_COARSE = {"。", "！", "？", "\n", "\u201c", "\u201d", "\u2018", "\u2019"}
-_FRONT_QUOTES = {"\u201c", "\u2018"}
-_BACK_QUOTES = {"\u201d", "\u2019"}
+from devkit.files.extract_code import iter_code_files
+from devkit.utils import parallel_map
 
-_COARSE_PTN = re.compile('([。\u201c\u201d！？\n])')
-_FINE_PTN = re.compile('([，：。;\u201c\u201d；…！!?？\r\n])')
+_SPLIT_FINE = "，：。;\u201c\u201d；…！!?？\r\n"
+_SPLIT_COARSE = "。\u201c\u201d！？\n"
+_FRONT_QUOTES = "\u201c\u2018"
+_BACK_QUOTES = "\u201d\u2019"
 
+_END = (None,)
 
-def split_sentence(text: str, criterion: str = "coarse") -> List[str]:
+
+class SentenceSplitter:
+    """Quote-aware sentence splitter for a configurable punctuation set.
+
+    The split pattern is compiled once per instance, so a splitter can be
+    reused for any number of texts without paying regex setup per call.
+
+    Args:
+        puncs: Characters that end a segment (e.g. "。！？" or ".!?").
+        front_quotes: Opening quote characters; text after one stays in the
+            same sentence.
+        back_quotes: Closing quote characters; text after one stays in the
+            same sentence unless the quote itself follows punctuation.
+        abbreviations: Strings such as "Mr." or "e.g." whose punctuation
+            never ends a sentence (matched case-insensitively at a word start).
+        require_space_after: Characters of puncs that end a segment only when
+            followed by whitespace, a quote or the end of the text, so "3.14"
+            and "example.com" stay whole (default: ".").
+        split_back_quotes: Also split on back quotes missing from puncs, so
+            a closing quote after punctuation stays with its sentence. The
+            built-in coarse/fine splitters keep their historical behaviour
+            and turn this off.
+    """
+
+    def __init__(
+        self,
+        puncs: Iterable[str],
+        front_quotes: Iterable[str] = _FRONT_QUOTES,
+        back_quotes: Iterable[str] = _BACK_QUOTES,
+        abbreviations: Iterable[str] = (),
+        require_space_after: Iterable[str] = ".",
+        split_back_quotes: bool = True,
+    ):
+        split_chars = list(dict.fromkeys(puncs))
+        self.front_quotes: Set[str] = set(front_quotes)
+        self.back_quotes: Set[str] = set(back_quotes)
+        self.abbreviations: Tuple[str, ...] = tuple(abbreviations)
+        self.require_space_after: Set[str] = set(require_space_after)
+        if not split_chars or any(len(p) != 1 for p in split_chars):
+            raise ValueError("puncs must be a non-empty collection of single characters")
+        if any(len(q) != 1 for q in self.front_quotes | self.back_quotes):
+            raise ValueError("quotes must be single characters")
+        if any(len(p) != 1 for p in self.require_space_after):
+            raise ValueError("require_space_after must contain single characters")
+        if split_back_quotes:
+            split_chars = list(dict.fromkeys(chain(split_chars, sorted(self.back_quotes))))
+
+        # Membership set for the merge rules: quotes count as punctuation even
+        # when they are not split points.
+        self.puncs: Set[str] = set(split_chars) | self.front_quotes | self.back_quotes
+
+        # Split points: front quotes on their own, other split characters in runs.
+        alternatives = [re.escape(q) for q in split_chars if q in self.front_quotes]
+        others = [p for p in split_chars if p not in self.front_quotes]
+        spaced = [p for p in others if p in self.require_space_after]
+        if others:
+            run = "[" + "".join(re.escape(p) for p in others) + "]"
+            if spaced:
+                # A run ending in such a character needs a space, quote or end of
+                # text after it; one ending in any other split character does not.
+                follow = "".join(re.escape(q) for q in sorted(self.front_quotes | self.back_quotes | {'"', "'"}))
+                alternatives.append(run + r"+(?=[\s" + follow + r"]|\Z)")
+                plain = [p for p in others if p not in self.require_space_after]
+                if plain:
+                    alternatives.append(run + "*[" + "".join(re.escape(p) for p in plain) + "]")
+            else:
+                alternatives.append(run + "+")
+        if self.abbreviations:
+            abbrevs = sorted(self.abbreviations, key=len, reverse=True)
+            alternatives.insert(0, r"(?P<abbr>\b(?i:" + "|".join(re.escape(a) for a in abbrevs) + "))")
+        self.pattern = re.compile("|".join(alternatives))
+        # Matches this close to the end of an incomplete buffer may still grow
+        # into an abbreviation, so streaming defers them.
+        self.lookback = max((len(a) for a in self.abbreviations), default=0)
+        # A match reaching the end of an incomplete buffer may only have matched
+        # the end of text, so streaming defers it too.
+        self.defer_end = bool(spaced)
+
+    def split(self, text: str, return_offsets: bool = False) -> list:
+        """Split text into sentences.
+
+        Args:
+            text: Input text.
+            return_offsets: Return (start, end) offsets into text instead of
+                sentence strings.
+
+        Returns:
+            List of sentence strings, or of (start, end) tuples.
+        """
+        if not text or not text.strip():
+            return []
+        starts, _, _ = _SpanScanner(self).scan(text, 0, 0, final=True)
+        ends = starts[1:] + [len(text)]
+        if return_offsets:
+            return list(zip(starts, ends))
+        return [text[start:end] for start, end in zip(starts, ends)]
+
+    def split_many(self, texts: Iterable[str], return_offsets: bool = False) -> List[list]:
+        """Split each of many texts, reusing the compiled pattern.
+
+        Args:
+            texts: Iterable of input texts.
+            return_offsets: Return (start, end) offsets instead of strings.
+
+        Returns:
+            One list of sentences (or offsets) per input text.
+        """
+        split = self.split
+        return [split(text, return_offsets) for text in texts]
+
+    def iter_sentences(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Split text arriving in chunks into sentences, lazily.
+
+        Each sentence is yielded as soon as the following text shows it is
+        complete, so memory is bounded by the longest sentence rather than
+        the input size. Results equal split on the concatenated chunks.
+
+        Args:
+            chunks: Iterable of text chunks, e.g. an open text file.
+
+        Returns:
+            Iterator over sentence strings.
+        """
+        if isinstance(chunks, str):
+            chunks = [chunks]
+        return self._iter_sentences(chunks)
+
+    def _iter_sentences(self, chunks: Iterable[str]) -> Iterator[str]:
+        scanner = _SpanScanner(self)
+        # The buffer holds the current sentence plus not-yet-consumed text.
+        buffer = ""
+        pos = 0
+        search = 0
+        # Whitespace-only input yields nothing, so hold output until real text shows up.
+        has_text = False
+        held: List[str] = []
+
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if not has_text and not chunk.isspace():
+                has_text = True
+            buffer += chunk
+            starts, pos, search = scanner.scan(buffer, 0, pos, final=False, search=search)
+            cur = 0
+            for start in starts:
+                if start > cur:
+                    held.append(buffer[cur:start])
+                cur = start
+            if cur:
+                buffer = buffer[cur:]
+                pos -= cur
+                search -= cur
+            if has_text and held:
+                yield from held
+                held.clear()
+
+        if not has_text:
+            return
+        starts, _, _ = scanner.scan(buffer, 0, pos, final=True, search=search)
+        cur = 0
+        for start in starts:
+            if start > cur:
+                held.append(buffer[cur:start])
+            cur = start
+        if buffer[cur:]:
+            held.append(buffer[cur:])
+        yield from held
+
+
+class _SpanScanner:
+    """Single-pass, quote-aware sentence boundary scanner.
+
+    Works on offsets into the text: each punctuation match and each run of
+    text between matches is a segment, and a segment either extends the
+    current sentence or starts a new one. Only the start offsets are
+    recorded, so nothing is copied. State is kept between calls so the same
+    scanner can resume over a growing buffer when streaming.
+    """
+
+    def __init__(self, splitter: SentenceSplitter):
+        self.finditer = splitter.pattern.finditer
+        self.puncs = splitter.puncs
+        self.front_quotes = splitter.front_quotes
+        self.back_quotes = splitter.back_quotes
+        self.has_abbreviations = bool(splitter.abbreviations)
+        self.lookback = splitter.lookback
+        self.defer_end = splitter.defer_end
+        self.started = False
+        self.quote_flag = False
+
+    def scan(
+        self, text: str, cur: int, pos: int, final: bool, search: Optional[int] = None
+    ) -> Tuple[List[int], int, int]:
+        """Scan text[pos:] given that the current sentence starts at cur.
+
+        Args:
+            text: Buffer being scanned.
+            cur: Start offset of the current (unfinished) sentence.
+            pos: Offset where scanning resumes.
+            final: If False, text after the last punctuation is left
+                unconsumed because it may continue in the next chunk.
+            search: Offset to resume searching for punctuation from, as
+                returned by the previous call.
+
+        Returns:
+            Tuple of (start offsets of sentences begun in this call, offset
+            up to which text was consumed, offset the next call's search
+            should resume from).
+        """
+        puncs = self.puncs
+        front_quotes = self.front_quotes
+        back_quotes = self.back_quotes
+        has_abbreviations = self.has_abbreviations
+        started = self.started
+        quote_flag = self.quote_flag
+        starts: List[int] = []
+        append = starts.append
+        end = len(text)
+        limit = end if final else end - self.lookback
+        defer_end = self.defer_end and not final
+        resume = pos if search is None else search
+        matches = self.finditer(text, resume)
+
+        for match in chain(matches, _END):
+            if match is not None:
+                i, j = match.span()
+                if i >= limit:
+                    break
+                if defer_end and j == end:
+                    limit = i
+                    break
+                if has_abbreviations and match.lastgroup:
+                    # Abbreviations are ordinary text.
+                    resume = j
+                    continue
+            elif final and pos < end:
+                i = j = end
+            else:
+                break
+
+            if pos < i:
+                # Text segment [pos, i); a lone quote the pattern does not split
+                # on still counts as punctuation.
+                if i - pos == 1 and text[pos] in puncs:
+                    if not started:
+                        started = True
+                        cur = pos
+                        append(pos)
+                        quote_flag = text[pos] in front_quotes
+                    elif text[pos] in front_quotes:
+                        quote_flag = True
+                        if text[pos - 1] in puncs:
+                            cur = pos
+                            append(pos)
+                elif not started:
+                    started = True
+                    cur = pos
+                    append(pos)
+                elif quote_flag:
+                    quote_flag = False
+                elif text[pos - 1] not in back_quotes or (pos - cur > 1 and text[pos - 2] in puncs):
+                    cur = pos
+                    append(pos)
+            pos = j
+            if match is None:
+                break
+
+            # Punctuation segment [i, j): a front quote or a run of other marks.
+            if not started:
+                started = True
+                cur = i
+                append(i)
+                quote_flag = text[i] in front_quotes
+            elif text[i] in front_quotes:
+                quote_flag = True
+                if text[i - 1] in puncs:
+                    cur = i
+                    append(i)
+
+        self.started = started
+        self.quote_flag = quote_flag
+        # Nothing can start a match before limit any more, even once more text arrives.
+        return starts, pos, max(resume, pos, limit)
+
+
+_SPLITTERS = {
+    "coarse": SentenceSplitter(_SPLIT_COARSE, split_back_quotes=False),
+    "fine": SentenceSplitter(_SPLIT_FINE, split_back_quotes=False),
+}
+
+
+def _get_splitter(criterion: str) -> SentenceSplitter:
+    splitter = _SPLITTERS.get(criterion)
+    if splitter is None:
+        raise ValueError("criterion must be 'coarse' or 'fine'")
+    return splitter
+
+
+def iter_sentences(chunks: Iterable[str], criterion: str = "coarse") -> Iterator[str]:
+    """Split text arriving in chunks into sentences, lazily.
+
+    Args:
+        chunks: Iterable of text chunks, e.g. an open text file.
+        criterion: 'coarse' (sentence-level) or 'fine' (clause-level).
+
+    Returns:
+        Iterator over sentence strings (see SentenceSplitter.iter_sentences).
+    """
+    return _get_splitter(criterion).iter_sentences(chunks)
+
+
+def split_sentence(text: str, criterion: str = "coarse", return_offsets: bool = False) -> list:
     """Split text into sentences.
 
     Args:
         text: Input text.
         criterion: 'coarse' (sentence-level) or 'fine' (clause-level).
+        return_offsets: Return (start, end) offsets into text instead of
+            sentence strings.
 
     Returns:
-        List of sentence strings.
+        List of sentence strings, or of (start, end) tuples.
     """
     if not text or not text.strip():
         return []
+    return _get_splitter(criterion).split(text, return_offsets)
 
-    if criterion == "coarse":
-        tmp_list = _COARSE_PTN.split(text)
-        puncs = _PUNCS_COARSE
-    elif criterion == "fine":
-        tmp_list = _FINE_PTN.split(text)
-        puncs = _PUNCS_FINE
-    else:
-        raise ValueError("criterion must be 'coarse' or 'fine'")
 
-    sentences: List[str] = []
-    quote_flag = False
+def _sentence_records(doc_id, text: str, criterion: str) -> Tuple[int, str]:
+    """Split one document and serialize its sentences as JSONL lines (worker task)."""
+    lines = [
+        json.dumps({"doc_id": doc_id, "sentence_idx": i, "sentence": sentence}, ensure_ascii=False)
+        for i, sentence in enumerate(split_sentence(text, criterion=criterion))
+    ]
+    return len(lines), "".join(line + "\n" for line in lines)
 
-    for seg in tmp_list:
-        if seg == "":
-            continue
 
-        if seg in puncs:
-            if len(sentences) == 0:
-                if seg in _FRONT_QUOTES:
-                    quote_flag = True
-                sentences.append(seg)
-                continue
+def _split_jsonl_task(item: Tuple[int, str], criterion: str, field: str, id_field: str) -> Tuple[int, str]:
+    line_number, line = item
+    record = json.loads(line)
+    text = record.get(field)
+    return _sentence_records(record.get(id_field, line_number), "" if text is None else str(text), criterion)
+
+
+def _split_file_task(item: Tuple[str, str], criterion: str) -> Tuple[int, str]:
+    path, doc_id = item
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return _sentence_records(doc_id, f.read(), criterion)
+
+
+def split_corpus(
+    source: str,
+    output: str,
+    criterion: str = "coarse",
+    workers: int = 1,
+    field: str = "text",
+    id_field: str = "id",
+    extensions: Sequence[str] = ("txt", "md"),
+    chunk_size: int = 64,
+    progress: Optional[Callable[[int, int], None]] = None,
+    progress_every: int = 10000,
+) -> Tuple[int, int]:
+    """Split every document of a directory or JSONL file into sentence records.
+
+    Documents are split across a process pool and written to output as
+    JSONL records {doc_id, sentence_idx, sentence}, streamed in input order.
+
+    Args:
+        source: Directory of text files, or a JSONL file.
+        output: Output JSONL path.
+        criterion: 'coarse' (sentence-level) or 'fine' (clause-level).
+        workers: Number of worker processes.
+        field: Text field of JSONL records.
+        id_field: Document id field of JSONL records (line number if absent).
+        extensions: File extensions to include from a directory.
+        chunk_size: Documents sent to a worker per task.
+        progress: Optional callback(docs, sentences).
+        progress_every: Number of documents between progress callbacks.
+
+    Returns:
+        Tuple of (documents processed, sentences written).
+    """
+    _get_splitter(criterion)
+    if os.path.isdir(source):
+        task = partial(_split_file_task, criterion=criterion)
+        results = parallel_map(task, iter_code_files(source, list(extensions)), workers, chunk_size)
+        return _write_sentence_records(results, output, progress, progress_every)
+
+    with open(source, "r", encoding="utf-8") as f:
+        items = ((n, line) for n, line in enumerate(f) if line.strip())
+        task = partial(_split_jsonl_task, criterion=criterion, field=field, id_field=id_field)
+        results = parallel_map(task, items, workers, chunk_size)
+        return _write_sentence_records(results, output, progress, progress_every)
 
-            if seg in _FRONT_QUOTES:
-                if sentences[-1][-1] in puncs:
-                    sentences.append(seg)
-                else:
-                    sentences[-1] += seg
-                quote_flag = True
-            else:
-                sentences[-1] += seg
-            continue
-
-        if len(sentences) == 0:
-            sentences.append(seg)
-            continue
-
-        if quote_flag:
-            sentences[-1] += seg
-            quote_flag = False
-        else:
-            if sentences[-1][-1] in _BACK_QUOTES:
-                if len(sentences[-1]) <= 1:
-                    sentences[-1] += seg
-                else:
-                    if sentences[-1][-2] in puncs:
-                        sentences.append(seg)
-                    else:
-                        sentences[-1] += seg
-            else:
-                sentences.append(seg)
 
-    return sentences
+def _write_sentence_records(
+    results: Iterable[Tuple[int, str]], output: str, progress: Optional[Callable[[int, int], None]], every: int
+) -> Tuple[int, int]:
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    docs = 0
+    sentences = 0
+    with open(output, "w", encoding="utf-8") as out:
+        for count, payload in results:
+            out.write(payload)
+            docs += 1
+            sentences += count
+            if progress is not None and docs % every == 0:
+                progress(docs, sentences)
+    return docs, sentences
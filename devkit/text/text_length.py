@@ -9,9 +9,18 @@ Assigns weights to different character types based on their information density:
 - Emoji: 0.2
 """
 
+import csv
+import json
 import math
+import os
 import re
 import unicodedata
+from array import array
+from collections import deque
+from functools import partial
+from typing import Dict, Iterable, Optional
+
+from devkit.utils import parallel_map
 
 _PATTERN = re.compile(
     r"(?P<word>\b[a-zA-Z]+\b)"
@@ -26,68 +35,281 @@ _PATTERN = re.compile(
 )
 
 
+_BMP_SIZE = 0x10000
+
+# Lazily built per-codepoint weights: a dense array for the BMP and a sparse
+# memo for astral codepoints, which are rare in practice.
+_bmp_weights: Optional[array] = None
+_astral_weights: Dict[int, float] = {}
+
+
+def _char_weight(char: str) -> float:
+    """Weight of a single character not matched by the main pattern."""
+    if "\u4E00" <= char <= "\u9FFF" or "\u3400" <= char <= "\u4DBF":
+        return 1.0
+    if "\uFF65" <= char <= "\uFF9F":
+        return 0.7
+    cat = unicodedata.category(char)
+    if cat.startswith("L"):
+        return 0.5
+    if cat.startswith("M"):
+        return 0.3
+    if cat.startswith("N"):
+        return 0.01
+    if cat.startswith("S"):
+        return 0.2
+    return 0.3
+
+
+def _get_bmp_weights() -> array:
+    """Build (once) the weight table for the Basic Multilingual Plane."""
+    global _bmp_weights
+    if _bmp_weights is None:
+        _bmp_weights = array("d", (_char_weight(chr(cp)) for cp in range(_BMP_SIZE)))
+    return _bmp_weights
+
+
 def _unclassified_length(text: str) -> float:
     """Calculate length for characters not matched by the main pattern."""
+    weights = _get_bmp_weights()
     length = 0.0
-    for char in text:
-        if "\u4E00" <= char <= "\u9FFF" or "\u3400" <= char <= "\u4DBF":
-            length += 1.0
-        elif "\uFF65" <= char <= "\uFF9F":
-            length += 0.7
+    for cp in map(ord, text):
+        if cp < _BMP_SIZE:
+            length += weights[cp]
         else:
-            cat = unicodedata.category(char)
-            if cat.startswith("L"):
-                length += 0.5
-            elif cat.startswith("M"):
-                length += 0.3
-            elif cat.startswith("N"):
-                length += 0.01
-            elif cat.startswith("S"):
-                length += 0.2
-            else:
-                length += 0.3
+            weight = _astral_weights.get(cp)
+            if weight is None:
+                weight = _astral_weights[cp] = _char_weight(chr(cp))
+            length += weight
     return length
 
 
-def calculate_custom_length(text: str) -> int:
-    """Calculate information-weighted text length.
-
-    Args:
-        text: Input text string.
-
-    Returns:
-        Weighted length as integer (floor).
-    """
-    if not text:
-        return 0
-
-    total = 0.0
+def _weighted_total(text: str, finditer, total: float = 0.0) -> float:
+    """Unrounded weighted length of one text (see calculate_custom_length), added to total."""
     last_index = 0
 
-    for match in _PATTERN.finditer(text):
+    for match in finditer(text):
         start, end = match.span()
         if last_index < start:
             total += _unclassified_length(text[last_index:start])
         last_index = end
 
-        if match.group("word"):
+        kind = match.lastgroup
+        if kind == "word":
             total += 0.47
-        elif match.group("mixed"):
-            total += len(match.group("mixed")) * 0.01
-        elif match.group("digit"):
-            total += len(match.group("digit")) * 0.01
-        elif match.group("space"):
-            total += len(match.group("space")) * 0.001
-        elif match.group("punctuation"):
+        elif kind == "mixed" or kind == "digit":
+            total += (end - start) * 0.01
+        elif kind == "space":
+            total += (end - start) * 0.001
+        elif kind == "punctuation":
             total += 0.05
-        elif match.group("fullwidth"):
+        elif kind == "fullwidth":
             total += 0.8
-        elif match.group("control"):
-            continue
-        elif match.group("emoji"):
+        elif kind == "emoji":
             total += 0.2
 
     if last_index < len(text):
         total += _unclassified_length(text[last_index:])
 
+    return total
+
+
+# Characters the pattern always matches on their own (whitespace, punctuation,
+# fullwidth, control, emoji), whatever surrounds them.
+_SELF_MATCHED = re.compile(
+    r"[\s\u2000-\u206F\u2E00-\u2E7F'!\"#$%&()*+,\-./:;<=>?@\[\]^_`{|}~\uFF00-\uFFEF\u0000-\u001F\u007F-\u009F"
+    r"\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]"
+)
+
+
+def _is_safe_cut(prev: str, char: str) -> bool:
+    """Check that splitting at prev|char changes neither the matches nor the summation order.
+
+    Multi-character matches are runs of ASCII letters/digits or whitespace,
+    and the \\b anchors around a letter or digit run (including fullwidth
+    and other Unicode digits) depend on whether the neighbouring character
+    is a word character, so a cut between two word characters is unsafe.
+    Runs of unmatched characters are summed as one subtotal, so one side of
+    the cut must be a character the pattern always matches by itself.
+    """
+    if not (_SELF_MATCHED.match(prev) or _SELF_MATCHED.match(char)):
+        return False
+    if (prev.isalnum() or prev == "_") and (char.isalnum() or char == "_"):
+        return False
+    return not (prev.isspace() and char.isspace())
+
+
+def _last_safe_cut(text: str, start: int = 0) -> int:
+    """Return the last index >= start where text can be split without changing its total, or 0."""
+    low = max(start, 1)
+    n = len(text)
+    # Every safe cut is next to a self-matched character: scan for those from
+    # the end (in C, over the reversed region) and test the cuts around each.
+    for match in _SELF_MATCHED.finditer(text[low - 1:][::-1]):
+        j = n - 1 - match.start()
+        for i in (j + 1, j):
+            if low <= i < n and _is_safe_cut(text[i - 1], text[i]):
+                return i
+    return 0
+
+
+def calculate_custom_length(text: str) -> int:
+    """Calculate information-weighted text length.
+
+    Args:
+        text: Input text string.
+
+    Returns:
+        Weighted length as integer (floor).
+    """
+    return math.floor(_weighted_total(text, _PATTERN.finditer)) if text else 0
+
+
+def calculate_custom_length_batch(texts: Iterable[str]) -> array:
+    """Calculate information-weighted lengths for many texts at once.
+
+    Produces the same values as calling calculate_custom_length on each text,
+    with the regex pattern and weight table bound once for the whole batch.
+
+    Args:
+        texts: Iterable of input strings.
+
+    Returns:
+        array('q') of weighted lengths, in input order.
+    """
+    finditer = _PATTERN.finditer
+    result = array("q")
+    for text in texts:
+        result.append(math.floor(_weighted_total(text, finditer)) if text else 0)
+    return result
+
+
+def calculate_custom_length_stream(chunks: Iterable[str]) -> int:
+    """Calculate information-weighted length of text arriving in chunks.
+
+    Each chunk is scored up to its last safe boundary and the remainder is
+    carried into the next one, so words, digit runs and mixed tokens that
+    straddle chunk boundaries are matched exactly as in the whole text, and
+    weights are added in the same order (the result always equals
+    calculate_custom_length of the joined text). Boundaries are next to
+    whitespace, punctuation and similar characters, so memory is
+    proportional to the chunk size plus the longest stretch of text without
+    one (e.g. a long base64 blob is carried whole).
+
+    Args:
+        chunks: Iterable of text chunks, in order.
+
+    Returns:
+        Weighted length as integer (floor).
+    """
+    finditer = _PATTERN.finditer
+    total = 0.0
+    carry = ""
+    for chunk in chunks:
+        buffer = carry + chunk if carry else chunk
+        # The carry holds no safe boundary, so only its end and the new chunk are scanned.
+        cut = _last_safe_cut(buffer, len(carry))
+        if cut:
+            total = _weighted_total(buffer[:cut], finditer, total)
+            carry = buffer[cut:]
+        else:
+            carry = buffer
+    if carry:
+        total = _weighted_total(carry, finditer, total)
     return math.floor(total)
+
+
+def calculate_file_length(path: str, chunk_size: int = 1 << 20) -> int:
+    """Calculate information-weighted length of a UTF-8 file without loading it.
+
+    Args:
+        path: Path to the text file.
+        chunk_size: Number of characters read per chunk.
+
+    Returns:
+        Weighted length as integer (floor).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return calculate_custom_length_stream(iter(lambda: f.read(chunk_size), ""))
+
+
+def _field_text(value) -> str:
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+def _jsonl_line_length(line: str, field: str, output_field: str) -> str:
+    """Annotate one JSONL line with the weighted length of its field (worker task)."""
+    record = json.loads(line)
+    record[output_field] = calculate_custom_length(_field_text(record.get(field)))
+    return json.dumps(record, ensure_ascii=False)
+
+
+def write_record_lengths(
+    input_path: str,
+    output_path: str,
+    field: str,
+    fmt: str = "jsonl",
+    workers: int = 1,
+    output_field: str = "weighted_length",
+    chunk_size: int = 1000,
+) -> int:
+    """Write the weighted length of one field for every record of a JSONL or CSV file.
+
+    Records are streamed in chunks and scored across a process pool; output
+    keeps input order, with the length added as a key (JSONL) or a trailing
+    column (CSV).
+
+    Args:
+        input_path: Input JSONL or CSV file.
+        output_path: Output file in the same format.
+        field: Name of the text field/column to score.
+        fmt: 'jsonl' or 'csv'.
+        workers: Number of worker processes.
+        output_field: Name of the added key/column.
+        chunk_size: Records sent to a worker per task.
+
+    Returns:
+        Number of records written.
+    """
+    if fmt not in ("jsonl", "csv"):
+        raise ValueError("fmt must be 'jsonl' or 'csv'")
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    newline = "" if fmt == "csv" else None
+    count = 0
+    with open(input_path, "r", encoding="utf-8", newline=newline) as f:
+        with open(output_path, "w", encoding="utf-8", newline=newline) as out:
+            if fmt == "jsonl":
+                lines = (line for line in f if line.strip())
+                task = partial(_jsonl_line_length, field=field, output_field=output_field)
+                for result in parallel_map(task, lines, workers=workers, chunk_size=chunk_size):
+                    out.write(result + "\n")
+                    count += 1
+                return count
+
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return 0
+            if field not in header:
+                raise ValueError(f"Field not found in CSV header: {field}")
+            index = header.index(field)
+            writer = csv.writer(out)
+            writer.writerow(header + [output_field])
+
+            # Rows wait here while their text is being scored by the pool.
+            pending_rows: deque = deque()
+
+            def texts():
+                for row in reader:
+                    pending_rows.append(row)
+                    yield row[index] if index < len(row) else ""
+
+            for length in parallel_map(calculate_custom_length, texts(), workers=workers, chunk_size=chunk_size):
+                row = pending_rows.popleft()
+                row.append(length)
+                writer.writerow(row)
+                count += 1
+    return count
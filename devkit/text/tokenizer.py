@@ -1,7 +1,25 @@
 """Simple tokenizer utilities (word/char level, no external deps)."""
 
+import mmap
+import os
 import re
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+_TOKEN_PATTERN = re.compile(r"[\u4e00-\u9fff]|[a-zA-Z]+|[0-9]+")
+# The same tokens over UTF-8 bytes: U+4E00..U+9FFF encode as E4 B8..BF xx and E5..E9 xx xx.
+_TOKEN_BYTES_PATTERN = re.compile(rb"\xe4[\xb8-\xbf][\x80-\xbf]|[\xe5-\xe9][\x80-\xbf][\x80-\xbf]|[a-zA-Z]+|[0-9]+")
+
+# Runs of one character category; every character falls in exactly one group.
+_ANALYZE_PATTERN = re.compile(
+    r"([\u4e00-\u9fff]+)"
+    r"|([a-zA-Z]+)"
+    r"|([0-9]+)"
+    r"|([ \t\n\r]+)"
+    r"|([^\u4e00-\u9fffa-zA-Z0-9 \t\n\r]+)"
+)
+
+# char_count category of characters outside the fast-path runs, filled lazily.
+_REST_CATEGORIES: Dict[str, str] = {}
 
 
 def word_tokenize(text: str) -> List[str]:
@@ -13,7 +31,40 @@ def word_tokenize(text: str) -> List[str]:
     Returns:
         List of tokens.
     """
-    return re.findall(r"[\u4e00-\u9fff]|[a-zA-Z]+|[0-9]+", text)
+    return _TOKEN_PATTERN.findall(text)
+
+
+def iter_tokens(text: str) -> Iterator[Tuple[str, int, int]]:
+    """Lazily tokenize text like word_tokenize, with positions.
+
+    Args:
+        text: Input text.
+
+    Yields:
+        (token, start, end) with character offsets into text.
+    """
+    for match in _TOKEN_PATTERN.finditer(text):
+        yield match.group(), match.start(), match.end()
+
+
+def iter_file_tokens(path: str) -> Iterator[Tuple[str, int, int]]:
+    """Stream word_tokenize tokens from a UTF-8 file through a memory map.
+
+    The file is never decoded as a whole; memory use is independent of its
+    size.
+
+    Args:
+        path: Path to a UTF-8 text file.
+
+    Yields:
+        (token, start, end) with byte offsets into the file.
+    """
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for match in _TOKEN_BYTES_PATTERN.finditer(mm):
+                yield match.group().decode("utf-8"), match.start(), match.end()
 
 
 def char_count(text: str) -> dict:
@@ -40,3 +91,78 @@ def char_count(text: str) -> dict:
         else:
             counts["other"] += 1
     return counts
+
+
+def _char_category(char: str) -> str:
+    """Return the char_count category of a single character."""
+    if "\u4E00" <= char <= "\u9FFF":
+        return "cjk"
+    if char.isalpha():
+        return "english"
+    if char.isdigit():
+        return "digits"
+    if char.isspace():
+        return "spaces"
+    if not char.isalnum():
+        return "punctuation"
+    return "other"
+
+
+def analyze_text(text: str) -> Tuple[List[str], Dict[str, int]]:
+    """Tokenize text and count characters by category in a single pass.
+
+    Equivalent to (word_tokenize(text), char_count(text)), but scans the
+    text once with one compiled pattern matching runs of each category.
+
+    Args:
+        text: Input text.
+
+    Returns:
+        Tuple of (tokens, counts) as returned by word_tokenize and char_count.
+    """
+    tokens: List[str] = []
+    extend = tokens.extend
+    append = tokens.append
+    cjk = english = digits = spaces = 0
+    rest = {"english": 0, "digits": 0, "spaces": 0, "punctuation": 0, "other": 0}
+
+    for cjk_run, english_run, digit_run, space_run, other_run in _ANALYZE_PATTERN.findall(text):
+        if cjk_run:
+            extend(cjk_run)
+            cjk += len(cjk_run)
+        elif english_run:
+            append(english_run)
+            english += len(english_run)
+        elif digit_run:
+            append(digit_run)
+            digits += len(digit_run)
+        elif space_run:
+            spaces += len(space_run)
+        else:
+            for char in other_run:
+                category = _REST_CATEGORIES.get(char)
+                if category is None:
+                    category = _REST_CATEGORIES[char] = _char_category(char)
+                rest[category] += 1
+
+    counts = {
+        "cjk": cjk,
+        "english": english + rest["english"],
+        "digits": digits + rest["digits"],
+        "spaces": spaces + rest["spaces"],
+        "punctuation": rest["punctuation"],
+        "other": rest["other"],
+    }
+    return tokens, counts
+
+
+def analyze_texts(texts: Iterable[str]) -> List[Tuple[List[str], Dict[str, int]]]:
+    """Run analyze_text over many texts.
+
+    Args:
+        texts: Iterable of input texts.
+
+    Returns:
+        List of (tokens, counts) tuples, in input order.
+    """
+    return [analyze_text(text) for text in texts]
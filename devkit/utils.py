@@ -4,7 +4,8 @@ import hashlib
 import json
 import uuid
 from datetime import datetime
-from typing import Any, Optional
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
 from urllib.parse import urlparse
 
 
@@ -100,3 +101,50 @@ def deduplicate(target_list: list) -> list:
             seen.add(item)
             result.append(item)
     return result
+
+
+def parallel_map(
+    func: Callable,
+    items: Iterable,
+    workers: int = 1,
+    chunk_size: int = 1000,
+    initializer: Optional[Callable] = None,
+    initargs: Tuple = (),
+) -> Iterator:
+    """Apply a function to items across worker processes, preserving order.
+
+    Items are consumed in blocks of workers * chunk_size with one block in
+    flight while the previous one is yielded, so memory stays bounded for
+    arbitrarily long inputs. With workers <= 1 everything runs in-process.
+
+    Args:
+        func: Picklable (module-level) function of one argument.
+        items: Iterable of inputs.
+        workers: Number of worker processes.
+        chunk_size: Items handed to a worker per task.
+        initializer: Optional function run once in each worker.
+        initargs: Arguments for the initializer.
+
+    Yields:
+        func(item) for each item, in input order.
+    """
+    if workers <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        yield from map(func, items)
+        return
+
+    import multiprocessing
+
+    iterator = iter(items)
+    block_size = workers * chunk_size
+    with multiprocessing.Pool(workers, initializer, initargs) as pool:
+        pending = None
+        while True:
+            block = list(islice(iterator, block_size))
+            submitted = pool.map_async(func, block, chunk_size) if block else None
+            if pending is not None:
+                yield from pending.get()
+            if submitted is None:
+                break
+            pending = submitted
@@ -0,0 +1,35 @@
+"""Shared test fixtures."""
+
+import pytest
+
+
+@pytest.fixture
+def offline_encoding(monkeypatch):
+    """Small tiktoken BPE encoding, so token tests need no downloaded rank files.
+
+    Uses the cl100k pre-tokenizer pattern with byte-level ranks plus a few
+    merges. Yields the list of encoding names loaded.
+    """
+    tiktoken = pytest.importorskip("tiktoken")
+    from devkit.ai import token_counter
+
+    ranks = {bytes([i]): i for i in range(256)}
+    for token in (b"th", b"he", b"the", b" t", b" the", b"  ", b"\n\n", b" \n"):
+        ranks[token] = len(ranks)
+    loads = []
+
+    def get_encoding(name):
+        loads.append(name)
+        return tiktoken.Encoding(
+            name=name,
+            pat_str=r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+| ?[^\s\p{L}\p{N}]++[\r\n]*+|\s++$|\s*[\r\n]|\s+(?!\S)|\s""",
+            mergeable_ranks=ranks,
+            special_tokens={"<|endoftext|>": len(ranks)},
+        )
+
+    monkeypatch.setattr(tiktoken, "get_encoding", get_encoding)
+    token_counter._get_encoding.cache_clear()
+    token_counter._encoding_available.cache_clear()
+    yield loads
+    token_counter._get_encoding.cache_clear()
+    token_counter._encoding_available.cache_clear()
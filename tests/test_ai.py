@@ -1,7 +1,28 @@
 """Tests for AI/LLM utility tools."""
 
-from devkit.ai.cost_calculator import calculate_cost, compare_costs, supported_models
-from devkit.ai.prompt_template import render_template, save_template, load_template, list_templates
+import os
+
+import pytest
+
+from devkit.ai import token_counter
+from devkit.ai.cost_calculator import (
+    calculate_cost,
+    calculate_costs_bulk,
+    compare_costs,
+    summarize_costs,
+    summarize_usage_log,
+    supported_models,
+)
+from devkit.ai.prompt_template import (
+    compile_template,
+    list_templates,
+    load_template,
+    render_many,
+    render_template,
+    save_template,
+    write_rendered_prompts,
+)
+from devkit.ai.template_store import TemplateStore
 
 
 def test_calculate_cost_gpt4o():
@@ -21,6 +42,46 @@ def test_compare_costs():
     assert len(result) > 0
 
 
+@pytest.mark.parametrize("use_numpy", [False, None])
+def test_calculate_costs_bulk_matches_calculate_cost(use_numpy):
+    models = ["gpt-4o", "claude-haiku", "no-such-model", "gpt-3.5-turbo"]
+    inputs = [1000, 250, 10, 4188]
+    outputs = [500, 40, 10, 995]
+    costs = calculate_costs_bulk(models, inputs, outputs, use_numpy=use_numpy)
+    for model, i, o, cost in zip(models, inputs, outputs, costs):
+        expected = calculate_cost(model, i, o)
+        if expected is None:
+            assert cost != cost  # NaN
+        else:
+            assert round(float(cost), 6) == expected
+    assert list(calculate_costs_bulk("gpt-4o", [1000], [500], use_numpy=use_numpy)) == [0.0075]
+
+
+@pytest.mark.parametrize("use_numpy", [False, None])
+def test_summarize_costs_groups_by_model(use_numpy):
+    summary = summarize_costs(["gpt-4o", "gpt-4", "gpt-4o", "mystery"], [1000, 10, 3000, 5], [0, 0, 500, 5],
+                              use_numpy=use_numpy)
+    assert list(summary) == ["gpt-4o", "gpt-4", "mystery"]
+    assert summary["gpt-4o"] == {"requests": 2, "input_tokens": 4000, "output_tokens": 500,
+                                 "cost": calculate_cost("gpt-4o", 4000, 500)}
+    assert summary["mystery"]["cost"] is None
+
+
+def test_summarize_usage_log_csv_and_jsonl(tmp_path):
+    csv_path = tmp_path / "usage.csv"
+    csv_path.write_text("model,input_tokens,output_tokens\ngpt-4o,1000,500\nclaude-haiku,200,\ngpt-4o,1000,500\n")
+    jsonl_path = tmp_path / "usage.jsonl"
+    jsonl_path.write_text('{"m": "gpt-4o", "in": 1000, "out": 500}\n\n{"in": 200}\n{"m": "gpt-4o", "in": 1000, "out": 500}\n')
+
+    from_csv = summarize_usage_log(str(csv_path), batch_size=2)
+    from_jsonl = summarize_usage_log(str(jsonl_path), model_field="m", input_field="in", output_field="out",
+                                     default_model="claude-haiku", batch_size=2)
+    assert from_csv == from_jsonl
+    assert from_csv["gpt-4o"] == {"requests": 2, "input_tokens": 2000, "output_tokens": 1000, "cost": 0.015}
+    assert from_csv["claude-haiku"]["requests"] == 1
+
+
+
 def test_supported_models():
     models = supported_models()
     assert "gpt-4o" in models
@@ -46,9 +107,273 @@ def test_save_and_load_template(tmp_path):
     assert loaded == "Hello {name}"
 
 
+def test_compile_template_is_cached_and_picklable():
+    import pickle
+
+    compiled = compile_template("Hi {{ name }}")
+    assert compiled == "Hi {{ name }}"
+    assert compile_template("Hi {{ name }}") is compiled
+    assert compile_template(compiled) is compiled
+    assert compiled.render({"name": "Ann"}) == "Hi Ann"
+    assert pickle.loads(pickle.dumps(compiled)).render({"name": "Bo"}) == "Hi Bo"
+    assert compile_template("Hi {name}").render({"name": "Cy"}) == "Hi Cy"
+
+
+def test_load_template_cached_until_file_changes(tmp_path):
+    path = save_template("p", "Hello {name}", prompts_dir=str(tmp_path))
+    first = load_template("p", prompts_dir=str(tmp_path))
+    assert load_template("p", prompts_dir=str(tmp_path)) is first
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Bye {name}")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000_000))
+    assert load_template("p", prompts_dir=str(tmp_path)).render({"name": "Al"}) == "Bye Al"
+    os.remove(path)
+    assert load_template("p", prompts_dir=str(tmp_path)) is None
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_render_many(workers):
+    rows = [{"name": f"user{i}", "items": list(range(i % 3))} for i in range(50)]
+    template = "{{ name }}:{% for i in items %} {{ i }}{% endfor %}"
+    rendered = list(render_many(template, iter(rows), workers=workers, chunk_size=4))
+    assert rendered == [render_template(template, row) for row in rows]
+
+
+def test_compiled_template_variables():
+    assert compile_template("{a.b} {c[0]:{width}} {} {0}").variables == {"a", "c", "width"}
+    jinja = compile_template("{% set x = 1 %}{% for i in range(n) %}{{ user.name }}{{ i }}{{ x }}{% endfor %}")
+    assert jinja.variables == {"n", "user"}
+    assert jinja.missing({"n": 1}) == ["user"]
+    assert compile_template("broken {").variables == frozenset()
+
+
+def test_optional_jinja_variables_are_not_required():
+    template = ("Hello {{ name }}{% if title %} {{ title }}{% endif %} {{ x | default('n/a') }}"
+                "{% if nick is defined %} ({{ nick }}){% endif %}{{ ' !' if loud else '' }}")
+    assert compile_template(template).variables == {"name"}
+    assert list(render_many(template, [{"name": "Ann"}])) == [render_template(template, {"name": "Ann"})]
+    with pytest.raises(ValueError, match="missing variables: name"):
+        list(render_many(template, [{"title": "Dr"}]))
+
+
+def test_render_many_skips_and_reports_invalid_rows():
+    rows = [{"name": "Ann", "age": 3}, {"name": "Bo"}, ["not", "a", "dict"], {"name": "Cy", "age": 5}]
+    errors = []
+    rendered = list(render_many("{name} is {age}", rows, on_invalid="skip", errors=errors))
+    assert rendered == ["Ann is 3", "Cy is 5"]
+    assert errors == [(1, "missing variables: age"), (2, "not a JSON object")]
+    with pytest.raises(ValueError, match="Row 1: missing variables: age"):
+        list(render_many("{{ name }} is {{ age }}", rows))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_render_many_skips_rows_whose_render_fails(workers):
+    rows = [{"user": {"name": {"first": "Ann"}, "admin": True}}, {"user": {}}, {"other": 1}]
+    errors = []
+    template = "{{ user.name.first }}{% if user.admin %}!{% endif %}"
+    assert list(render_many(template, rows, workers=workers, on_invalid="skip", errors=errors)) == ["Ann!"]
+    assert [index for index, _ in errors] == [1, 2]
+    assert errors[0][1].startswith("render error: UndefinedError")
+
+
+def test_write_rendered_prompts_skips_rows_whose_render_fails(tmp_path):
+    src = tmp_path / "vars.jsonl"
+    src.write_text('{"user": {"name": "Ann"}}\n{"user": {}}\n', encoding="utf-8")
+    out = tmp_path / "prompts.jsonl"
+    errors = []
+    assert write_rendered_prompts("Hi {user[name]}", str(src), str(out), on_invalid="skip", errors=errors) == 1
+    assert errors == [(2, "render error: KeyError: 'name'")]
+    with pytest.raises(ValueError, match="Line 2: render error: KeyError"):
+        write_rendered_prompts("Hi {user[name]}", str(src), str(out))
+
+
+def test_write_rendered_prompts_skips_malformed_json(tmp_path):
+    src = tmp_path / "vars.jsonl"
+    src.write_text('{"w": "a"}\n{"w": \n{"w": "b"}\n', encoding="utf-8")
+    out = tmp_path / "prompts.jsonl"
+    errors = []
+    assert write_rendered_prompts("<{w}>", str(src), str(out), on_invalid="skip", errors=errors) == 2
+    assert [(line_no, reason.split(":")[0]) for line_no, reason in errors] == [(2, "invalid JSON")]
+    with pytest.raises(ValueError, match="Line 2: invalid JSON"):
+        write_rendered_prompts("<{w}>", str(src), str(out))
+
+
+def test_write_rendered_prompts_with_tokens(offline_encoding, tmp_path):
+    import json
+
+    src = tmp_path / "vars.jsonl"
+    src.write_text('{"id": 1, "w": "world"}\n\n{"id": 2, "w": "the"}\n', encoding="utf-8")
+    out = tmp_path / "out" / "prompts.jsonl"
+    assert write_rendered_prompts("the {w}", str(src), str(out), model="gpt-4o", workers=2, chunk_size=1) == 2
+    records = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert records == [
+        {"id": 1, "w": "world", "prompt": "the world", "tokens": 7},
+        {"id": 2, "w": "the", "prompt": "the the", "tokens": token_counter.count_tokens("the the")},
+    ]
+
+
+@pytest.mark.parametrize("wal", [False, True])
+def test_template_store_save_load_and_cross_process_updates(tmp_path, wal):
+    db = str(tmp_path / "store" / "prompts.sqlite3")
+    with TemplateStore(db, wal=wal) as store, TemplateStore(db, wal=wal) as other:
+        mode = store._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == ("wal" if wal else "delete")
+        assert store.load("greet") is None
+        store.save("greet", "Hello {{ name }}")
+        first = store.load("greet")
+        assert first.render({"name": "Ann"}) == "Hello Ann"
+        assert store.load("greet") is first
+        assert store.names() == ["greet"] and "greet" in store
+
+        other.save("greet", "Hi {name}")
+        other.save("bye", "Bye")
+        assert store.load("greet") == "Hi {name}"
+        assert store.names() == ["bye", "greet"]
+        assert store.delete("bye") and not store.delete("bye")
+        assert len(other) == 1
+
+
+def test_template_store_import_export(tmp_path):
+    src = tmp_path / "prompts"
+    save_template("a", "A {x}", prompts_dir=str(src))
+    save_template("b", "B {{ y }}", prompts_dir=str(src))
+    (src / "notes.md").write_text("not a template")
+    with TemplateStore(str(tmp_path / "t.sqlite3")) as store:
+        assert store.import_dir(str(src)) == 2
+        assert store.export_dir(str(tmp_path / "out")) == 2
+    assert sorted(os.listdir(tmp_path / "out")) == ["a.txt", "b.txt"]
+    assert load_template("b", prompts_dir=str(tmp_path / "out")) == "B {{ y }}"
+
+
+def test_load_template_with_syntax_error_returns_text(tmp_path):
+    from jinja2 import TemplateSyntaxError
+
+    save_template("bad", "Hello {{ name }", prompts_dir=str(tmp_path))
+    loaded = load_template("bad", prompts_dir=str(tmp_path))
+    assert loaded == "Hello {{ name }"
+    with pytest.raises(TemplateSyntaxError):
+        loaded.render({"name": "Ann"})
+    with TemplateStore(str(tmp_path / "t.sqlite3")) as store:
+        store.save("bad", "{% if %}")
+        assert store.load("bad") == "{% if %}"
+
+
 def test_list_templates(tmp_path):
     (tmp_path / "prompt_a.txt").write_text("template a")
     (tmp_path / "prompt_b.txt").write_text("template b")
     templates = list_templates(prompts_dir=str(tmp_path))
     assert "prompt_a" in templates
     assert "prompt_b" in templates
+
+
+def test_count_tokens_caches_encoder(offline_encoding):
+    assert token_counter.count_tokens("world", model="gpt-4o") == 5
+    assert token_counter.count_tokens("the", model="gpt-4o") == 1
+    assert token_counter.count_tokens("你好", model="gpt-4o") == 6
+    assert token_counter.count_tokens("hi", model="gpt-4") == 2
+    assert offline_encoding == ["o200k_base", "cl100k_base"]
+
+
+def test_count_tokens_batch(offline_encoding):
+    texts = ["hello", "", "你好 world"] * 5
+    expected = [token_counter.count_tokens(t) for t in texts]
+    for threads in (1, 3):
+        counts = token_counter.count_tokens_batch(texts, model="gpt-4o", num_threads=threads, batch_size=4)
+        assert list(counts) == expected
+    assert len(token_counter.count_tokens_batch([])) == 0
+
+
+def test_count_tokens_file_chunked_matches_whole(offline_encoding, tmp_path):
+    import random
+    rng = random.Random(0)
+    pieces = ["the", " the", "  ", "\n", "\n\n", " \n", "\r\n", "你好", "123", ".", "it's", "x"]
+    path = tmp_path / "dump.txt"
+    for _ in range(50):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 120)))
+        path.write_bytes(text.encode("utf-8"))
+        whole = token_counter.count_tokens(path.read_text(encoding="utf-8"), model="gpt-4")
+        for chunk_size in (1, 5, 64):
+            assert token_counter.count_tokens_file(str(path), model="gpt-4", chunk_size=chunk_size) == whole
+
+
+def test_iter_record_tokens(offline_encoding, tmp_path):
+    path = tmp_path / "records.jsonl"
+    path.write_text('{"text": "the"}\n\n{"text": null}\n{"body": "x"}\n{"text": 12345}\n', encoding="utf-8")
+    assert list(token_counter.iter_record_tokens(str(path), field="text", batch_size=2)) == [1, 0, 0, 5]
+
+
+def test_approx_feature_vector():
+    text = "Hello world, 2024!\n\tdef f(x):  pass\n你好。Café 😀"
+    assert token_counter.approx_feature_vector(text) == [7, 22, 1, 4, 3, 4, 5, 2, 2, 2]
+    assert token_counter.approx_feature_vector("") == [0] * 10
+
+
+def test_count_tokens_approx(tmp_path):
+    assert token_counter.count_tokens("", method="approx") == 0
+    assert token_counter.count_tokens("!", method="approx") == 1
+    assert 8 <= token_counter.count_tokens("The quick brown fox jumps over the lazy dog.", method="approx") <= 12
+    text = "line one\nline two is longer\n  indented 123\n" * 50
+    path = tmp_path / "doc.txt"
+    path.write_text(text, encoding="utf-8")
+    assert token_counter.count_tokens_file(str(path), method="approx", chunk_size=7) == \
+        token_counter.approx_tokens(text)
+    with pytest.raises(ValueError):
+        token_counter.count_tokens("x", method="guess")
+
+
+def test_count_tokens_auto_falls_back(offline_encoding, monkeypatch):
+    import tiktoken
+    assert token_counter.count_tokens("the", method="auto") == 1
+    token_counter._get_encoding.cache_clear()
+    token_counter._encoding_available.cache_clear()
+
+    def unavailable(name):
+        raise ConnectionError("no network")
+
+    monkeypatch.setattr(tiktoken, "get_encoding", unavailable)
+    text = "no network here"
+    assert token_counter.count_tokens(text, method="auto") == token_counter.approx_tokens(text)
+
+
+def test_count_tokens_dir(offline_encoding, tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.py").write_text("the the", encoding="utf-8")
+    (tmp_path / "b.md").write_text("world", encoding="utf-8")
+    (tmp_path / "c.py").write_bytes(b"\xff\xfe")
+    for workers in (1, 2):
+        result = dict(token_counter.count_tokens_dir(str(tmp_path), extensions=["py", "md"], workers=workers))
+        assert result == {os.path.join("src", "a.py"): 2, "b.md": 5, "c.py": None}
+
+
+def test_token_cache_lru_and_stats(tmp_path):
+    from devkit.ai.token_cache import TokenCache, content_digest
+    path = str(tmp_path / "cache.sqlite3")
+    with TokenCache(path, max_entries=10) as cache:
+        for i in range(10):
+            cache.put(content_digest(f"text {i}"), "o200k_base", i)
+        assert cache.get(content_digest("text 0"), "o200k_base") == 0
+        assert cache.get(content_digest("text 0"), "cl100k_base") is None
+        cache.put(content_digest("text 10"), "o200k_base", 10)
+        # Over capacity: the least recently used tenth went, text 0 was just used.
+        assert cache.stats()["entries"] == 9
+        assert cache.get(content_digest("text 1"), "o200k_base") is None
+        assert cache.get(content_digest("text 0"), "o200k_base") == 0
+    with TokenCache(path, max_entries=10) as cache:
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 2, 9)
+
+
+def test_count_tokens_with_cache(offline_encoding, tmp_path):
+    from devkit.ai.token_cache import TokenCache
+    cache = TokenCache(str(tmp_path / "cache.sqlite3"))
+    assert token_counter.count_tokens("the world", cache=cache) == 7
+    assert token_counter.count_tokens("the world", cache=cache) == 7
+    path = tmp_path / "doc.txt"
+    path.write_text("the", encoding="utf-8")
+    assert token_counter.count_tokens_file(str(path), cache=cache) == 1
+    assert token_counter.count_tokens_file(str(path), cache=cache) == 1
+    path.write_text("world", encoding="utf-8")
+    assert token_counter.count_tokens_file(str(path), cache=cache) == 5
+    assert (cache.hits, cache.misses) == (2, 3)
+    cache.close()
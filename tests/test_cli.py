@@ -24,3 +24,131 @@ def test_subgroups_exist():
     for group in ["convert", "text", "files", "ai", "data", "web", "dev"]:
         result = runner.invoke(cli, [group, "--help"])
         assert result.exit_code == 0, f"Subgroup '{group}' failed"
+
+
+def test_text_length_batch(tmp_path):
+    f = tmp_path / "texts.txt"
+    f.write_text("你好世界\nHello world\n", encoding="utf-8")
+    runner = CliRunner()
+    result = runner.invoke(cli, ["text", "length", "--batch", str(f)])
+    assert result.exit_code == 0
+    assert result.output.split() == ["4", "0"]
+
+
+def test_text_length_jsonl_default_output_without_extension(tmp_path):
+    data = tmp_path / "v1.2" / "corpus"
+    data.parent.mkdir()
+    data.write_text('{"content": "你好"}\n', encoding="utf-8")
+    result = CliRunner().invoke(cli, ["text", "length", str(data), "--jsonl"])
+    assert result.exit_code == 0, result.output
+    assert (tmp_path / "v1.2" / "corpus.lengths.jsonl").exists()
+
+
+def test_text_keyword_index_and_query(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    corpus.write_text('{"text": "cat on the mat"}\n{"text": "cat and dog"}\n', encoding="utf-8")
+    index = tmp_path / "corpus.idx"
+    runner = CliRunner()
+    result = runner.invoke(cli, ["text", "keyword-index", str(corpus), "--field", "text", "-o", str(index)])
+    assert result.exit_code == 0
+    assert "2 documents" in result.output
+    result = runner.invoke(cli, ["text", "keywords", "cat dog dog", "--lang", "en", "--index", str(index)])
+    assert result.exit_code == 0
+    assert result.output.split()[0] == "dog"
+    index.write_bytes(index.read_bytes()[:-1])
+    result = runner.invoke(cli, ["text", "keywords", "cat dog dog", "--lang", "en", "--index", str(index)])
+    assert result.exit_code == 1
+    assert "Error: Truncated keyword index file" in result.output
+
+
+def test_ai_tokens_jsonl(offline_encoding, tmp_path):
+    records = tmp_path / "records.jsonl"
+    records.write_text('{"text": "the"}\n{"text": "world"}\n', encoding="utf-8")
+    counts = tmp_path / "counts.txt"
+    runner = CliRunner()
+    result = runner.invoke(cli, ["ai", "tokens", str(records), "--jsonl", "--field", "text", "-o", str(counts)])
+    assert result.exit_code == 0
+    assert "Tokens (gpt-4o): 6 in 2 records" in result.output
+    assert counts.read_text().split() == ["1", "5"]
+
+
+def test_ai_tokens_dir(offline_encoding, tmp_path):
+    (tmp_path / "a.py").write_text("the world", encoding="utf-8")
+    (tmp_path / "b.py").write_text("the", encoding="utf-8")
+    runner = CliRunner()
+    result = runner.invoke(cli, ["ai", "tokens", str(tmp_path), "--dir", "--model", "gpt-4o"])
+    assert result.exit_code == 0
+    assert "Total (gpt-4o): 8 tokens in 2 files, input cost $0.000020" in result.output
+
+
+def test_ai_tokens_cache(offline_encoding, tmp_path, monkeypatch):
+    from devkit.ai import token_cache
+    monkeypatch.setattr(token_cache, "DEFAULT_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(token_cache, "_default_cache", None)
+    runner = CliRunner()
+    for expected in ("0 hits, 1 misses", "1 hits, 1 misses"):
+        result = runner.invoke(cli, ["ai", "tokens", "the world", "--cache"])
+        assert result.exit_code == 0
+        assert "Tokens (gpt-4o): 7" in result.output
+        assert expected in result.output
+
+
+def test_ai_tokens_dir_cache_with_workers(offline_encoding, tmp_path, monkeypatch):
+    from devkit.ai import token_cache
+    monkeypatch.setattr(token_cache, "DEFAULT_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(token_cache, "_default_cache", None)
+    src = tmp_path / "src"
+    src.mkdir()
+    for i in range(3):
+        (src / f"f{i}.py").write_text("the " * (i + 1), encoding="utf-8")
+    runner = CliRunner()
+    for expected in ("0 hits, 3 misses (0%), 3 entries", "3 hits, 3 misses (50%), 3 entries"):
+        result = runner.invoke(cli, ["ai", "tokens", str(src), "--dir", "--workers", "2", "--cache"])
+        assert result.exit_code == 0
+        assert expected in result.output
+
+
+def test_ai_cost_log(tmp_path):
+    log = tmp_path / "usage.jsonl"
+    log.write_text('{"model": "gpt-4o", "input_tokens": 1000, "output_tokens": 500}\n'
+                   '{"model": "gpt-4o", "input_tokens": 1000, "output_tokens": 500}\n')
+    result = CliRunner().invoke(cli, ["ai", "cost", "--log", str(log)])
+    assert result.exit_code == 0
+    assert "Total: $0.015000 for 2 requests" in result.output
+
+    result = CliRunner().invoke(cli, ["ai", "cost", "--model", "gpt-4o"])
+    assert result.exit_code == 1
+
+
+def test_ai_prompt_vars_jsonl(tmp_path, monkeypatch):
+    from devkit.ai import prompt_template
+    monkeypatch.setattr(prompt_template, "DEFAULT_PROMPTS_DIR", str(tmp_path / "prompts"))
+    prompt_template.save_template("greet", "Hello, {{ name }}!")
+    rows = tmp_path / "rows.jsonl"
+    rows.write_text('{"name": "Ann"}\n{"nome": "Xi"}\n{"name": "Bo"}\n', encoding="utf-8")
+    out = tmp_path / "out.jsonl"
+    result = CliRunner().invoke(cli, ["ai", "prompt", "greet", "--vars-jsonl", str(rows), "-o", str(out)])
+    assert result.exit_code == 0
+    assert "Wrote 2 prompts" in result.output
+    assert "line 2: missing variables: name" in result.output
+    assert '"prompt": "Hello, Bo!"' in out.read_text(encoding="utf-8")
+
+
+def test_ai_prompt_store(tmp_path):
+    db = str(tmp_path / "prompts.sqlite3")
+    runner = CliRunner()
+    assert runner.invoke(cli, ["ai", "prompt", "greet", "--store", db, "--save", "Hello, {name}!"]).exit_code == 0
+    result = runner.invoke(cli, ["ai", "prompt", "greet", "--store", db, "--vars", '{"name": "Ann"}'])
+    assert result.output == "Hello, Ann!\n"
+    result = runner.invoke(cli, ["ai", "prompt-store", "export", str(tmp_path / "out"), "--store", db])
+    assert "Exported 1 templates" in result.output
+    assert (tmp_path / "out" / "greet.txt").read_text(encoding="utf-8") == "Hello, {name}!"
+
+
+def test_data_json_flatten_jsonl(tmp_path):
+    src = tmp_path / "in.jsonl"
+    src.write_text('{"a": {"b": [1, 2]}}\n', encoding="utf-8")
+    result = CliRunner().invoke(cli, ["data", "json-flatten", str(src), "--jsonl", "--lists", "--separator", "/"])
+    assert result.exit_code == 0
+    assert "Wrote 1 records" in result.output
+    assert (tmp_path / "in.flat.jsonl").read_text(encoding="utf-8") == '{"a/b/0": 1, "a/b/1": 2}\n'
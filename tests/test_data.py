@@ -4,7 +4,7 @@ import csv
 import json
 import os
 
-from devkit.data.json_utils import flatten_json, unflatten_json, json_query, merge_jsonl
+from devkit.data.json_utils import flatten_json, flatten_jsonl, unflatten_json, unflatten_jsonl, json_query, merge_jsonl
 from devkit.data.csv_utils import merge_csvs, split_csv, csv_to_json, json_to_csv
 
 
@@ -26,6 +26,40 @@ def test_unflatten_json():
     assert result == {"a": {"b": {"c": 1, "d": 2}}, "e": 3}
 
 
+def test_flatten_json_lists_round_trip():
+    data = {"a": [1, {"b": [2, 3]}, []], "c": {"d": None}}
+    assert flatten_json(data) == {"a": [1, {"b": [2, 3]}, []], "c.d": None}
+    flat = flatten_json(data, lists=True)
+    assert flat == {"a.0": 1, "a.1.b.0": 2, "a.1.b.1": 3, "a.2": [], "c.d": None}
+    assert unflatten_json(flat, lists=True) == data
+    assert unflatten_json({"x.0": 1, "x.2": 2}, lists=True) == {"x": {"0": 1, "2": 2}}
+
+
+def test_flatten_json_deeper_than_recursion_limit():
+    import sys
+
+    data = value = {}
+    for _ in range(sys.getrecursionlimit() + 100):
+        value["k"] = {}
+        value = value["k"]
+    value["leaf"] = 1
+    (key, leaf), = flatten_json(data).items()
+    assert leaf == 1 and key.count(".") == sys.getrecursionlimit() + 100
+
+
+def test_flatten_and_unflatten_jsonl(tmp_path):
+    src = tmp_path / "in.jsonl"
+    records = [{"a": {"b": 1}, "l": [1, 2]}, {"a": {"c": "é"}}]
+    src.write_text("\n".join(json.dumps(r) for r in records) + "\n\n[1, 2]\n", encoding="utf-8")
+    flat = tmp_path / "flat.jsonl"
+    assert flatten_jsonl(str(src), str(flat), lists=True) == 3
+    lines = [json.loads(line) for line in flat.read_text(encoding="utf-8").splitlines()]
+    assert lines == [{"a.b": 1, "l.0": 1, "l.1": 2}, {"a.c": "é"}, [1, 2]]
+    nested = tmp_path / "nested.jsonl"
+    assert unflatten_jsonl(str(flat), str(nested), lists=True) == 3
+    assert [json.loads(line) for line in nested.read_text(encoding="utf-8").splitlines()] == records + [[1, 2]]
+
+
 def test_json_query():
     data = {"a": {"b": [1, 2, 3]}}
     assert json_query(data, "a.b") == [1, 2, 3]
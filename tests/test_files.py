@@ -1,9 +1,10 @@
 """Tests for file management tools."""
 
+import os
 
 from devkit.files.dedup import find_duplicates
 from devkit.files.search_log import search_file
-from devkit.files.extract_code import extract_code_files
+from devkit.files.extract_code import extract_code_files, iter_code_files
 from devkit.files.batch_rename import batch_rename
 
 
@@ -44,6 +45,19 @@ def test_extract_code_files(tmp_path):
     assert "notes.txt" not in result
 
 
+def test_iter_code_files(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "b.py").write_text("b")
+    (tmp_path / "pkg" / "a.py").write_text("a")
+    (tmp_path / "notes.txt").write_text("n")
+    for name in ("zeta", "alpha", "mid"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "m.py").write_text(name)
+    found = [rel for _, rel in iter_code_files(str(tmp_path), extensions=["py"])]
+    assert found == [os.path.join(d, f) for d, f in
+                     [("alpha", "m.py"), ("mid", "m.py"), ("pkg", "a.py"), ("pkg", "b.py"), ("zeta", "m.py")]]
+
+
 def test_batch_rename_dry_run(tmp_path):
     (tmp_path / "photo1.jpg").write_text("")
     (tmp_path / "photo2.jpg").write_text("")
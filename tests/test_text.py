@@ -1,7 +1,32 @@
 """Tests for text processing tools."""
 
-from devkit.text.text_length import calculate_custom_length
-from devkit.text.split_sentence import split_sentence
+import csv
+import json
+import random
+import re
+import sys
+import unicodedata
+
+import pytest
+
+from devkit.text.text_length import (
+    calculate_custom_length,
+    calculate_custom_length_batch,
+    calculate_custom_length_stream,
+    calculate_file_length,
+    write_record_lengths,
+    _unclassified_length,
+)
+from devkit.text.keywords import KeywordIndex, extract_keywords
+from devkit.text.tokenizer import (
+    analyze_text,
+    analyze_texts,
+    char_count,
+    iter_file_tokens,
+    iter_tokens,
+    word_tokenize,
+)
+from devkit.text.split_sentence import SentenceSplitter, iter_sentences, split_corpus, split_sentence
 
 
 def test_text_length_english():
@@ -25,6 +50,120 @@ def test_text_length_empty():
     assert result == 0
 
 
+def test_text_length_batch_matches_scalar():
+    texts = ["Hello world", "你好世界", "", "Order A1234 😀 ｱｲｳ", "Ünïcödé 𠀀 text 123"]
+    result = calculate_custom_length_batch(texts)
+    assert list(result) == [calculate_custom_length(t) for t in texts]
+
+
+def test_text_length_batch_empty():
+    assert len(calculate_custom_length_batch([])) == 0
+
+
+def test_text_length_stream_matches_whole_text():
+    text = "Hello world 你好 order A1234 shipped 2024 😀 " * 50
+    for size in (1, 3, 7, 64):
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        assert calculate_custom_length_stream(chunks) == calculate_custom_length(text)
+
+
+def test_text_length_stream_keeps_tokens_across_chunks():
+    # "abc" is three unclassified letters before a CJK char, but a word when alone.
+    assert calculate_custom_length_stream(["ab", "c你"]) == calculate_custom_length("abc你")
+    assert calculate_custom_length_stream(["123", "456", "789"]) == calculate_custom_length("123456789")
+
+
+def test_text_length_stream_keeps_summation_order():
+    # Splitting the unclassified run "½" .. "ｱ文" changes the float sum's rounding.
+    text = "½b𝟎！½！文中Y.91ｱ文Y"
+    assert calculate_custom_length_stream(list(text)) == calculate_custom_length(text) == 6
+
+
+def test_text_length_stream_unicode_digits():
+    text = "第１２，" * 200
+    assert calculate_custom_length_stream(list(text)) == calculate_custom_length(text)
+    rng = random.Random(0)
+    alphabet = "第１２３ａＡ٣४𝟎a1_ é，。.!😀\n"
+    for _ in range(2000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 40)))
+        cuts = sorted(rng.sample(range(1, len(text) + 1), min(len(text), rng.randint(0, 8))))
+        chunks = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+        assert calculate_custom_length_stream(chunks) == calculate_custom_length(text), chunks
+
+
+def test_text_length_stream_long_unsplittable_run():
+    text = "x" + "a" * 200_000 + " end"
+    chunks = [text[i:i + 1000] for i in range(0, len(text), 1000)]
+    assert calculate_custom_length_stream(chunks) == calculate_custom_length(text)
+
+
+def test_calculate_file_length(tmp_path):
+    f = tmp_path / "corpus.txt"
+    text = "第一句话。Hello world!\n" * 100
+    f.write_text(text, encoding="utf-8")
+    assert calculate_file_length(str(f), chunk_size=5) == calculate_custom_length(text)
+
+
+def test_write_record_lengths_jsonl(tmp_path):
+    src = tmp_path / "corpus.jsonl"
+    texts = ["你好世界", "Hello world", "", "第一句话。" * 3] * 5
+    src.write_text("\n".join(json.dumps({"id": i, "content": t}) for i, t in enumerate(texts)) + "\n")
+    out = tmp_path / "out.jsonl"
+    count = write_record_lengths(str(src), str(out), "content", workers=2, chunk_size=3)
+    assert count == len(texts)
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [r["id"] for r in records] == list(range(len(texts)))
+    assert [r["weighted_length"] for r in records] == [calculate_custom_length(t) for t in texts]
+
+
+def test_write_record_lengths_csv(tmp_path):
+    src = tmp_path / "corpus.csv"
+    src.write_text("id,content\n1,你好世界\n2,\"多行\n文本\"\n", encoding="utf-8")
+    out = tmp_path / "out.csv"
+    assert write_record_lengths(str(src), str(out), "content", fmt="csv") == 2
+    with open(out, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["id", "content", "weighted_length"]
+    assert rows[1][2] == "4"
+    assert rows[2][1] == "多行\n文本"
+
+
+def _reference_unclassified_length(text):
+    """Original per-character implementation, kept to pin down the weight table."""
+    length = 0.0
+    for char in text:
+        if "\u4E00" <= char <= "\u9FFF" or "\u3400" <= char <= "\u4DBF":
+            length += 1.0
+        elif "\uFF65" <= char <= "\uFF9F":
+            length += 0.7
+        else:
+            cat = unicodedata.category(char)
+            if cat.startswith("L"):
+                length += 0.5
+            elif cat.startswith("M"):
+                length += 0.3
+            elif cat.startswith("N"):
+                length += 0.01
+            elif cat.startswith("S"):
+                length += 0.2
+            else:
+                length += 0.3
+    return length
+
+
+def test_unclassified_length_every_codepoint():
+    mismatches = [
+        cp for cp in range(sys.maxunicode + 1)
+        if _unclassified_length(chr(cp)) != _reference_unclassified_length(chr(cp))
+    ]
+    assert mismatches == []
+
+
+def test_unclassified_length_sum_is_bit_identical():
+    text = "".join(chr(cp) for cp in range(0x3000, 0xA000)) + "\U00020000\U0001F900\U000E0001"
+    assert _unclassified_length(text) == _reference_unclassified_length(text)
+
+
 def test_split_sentence_coarse():
     text = "第一句话。第二句话。第三句话。"
     result = split_sentence(text, criterion="coarse")
@@ -40,3 +179,333 @@ def test_split_sentence_fine():
 def test_split_sentence_empty():
     result = split_sentence("", criterion="coarse")
     assert result == []
+
+
+def test_iter_sentences_matches_split_sentence():
+    text = "他说：\u201c今天天气很好。\u201d我们去公园吧！你好，世界？\n最后一句"
+    for criterion in ("coarse", "fine"):
+        expected = split_sentence(text, criterion=criterion)
+        chunks = [text[i:i + 3] for i in range(0, len(text), 3)]
+        assert list(iter_sentences(chunks, criterion=criterion)) == expected
+
+
+def test_iter_sentences_is_lazy():
+    def chunks():
+        yield "第一句话。第二句"
+        yield "话。"
+        raise AssertionError("consumed too far")
+
+    it = iter_sentences(chunks())
+    assert next(it) == "第一句话。"
+
+
+def test_iter_sentences_from_file(tmp_path):
+    f = tmp_path / "novel.txt"
+    f.write_text("第一句话。\n第二句话。\n", encoding="utf-8")
+    with open(f, encoding="utf-8") as fh:
+        assert list(iter_sentences(fh)) == split_sentence(f.read_text(encoding="utf-8"))
+
+
+def test_iter_sentences_whitespace_only():
+    assert list(iter_sentences(["  ", "\n"])) == []
+
+
+def test_split_sentence_offsets():
+    text = "他说：\u201c今天天气很好。\u201d我们去公园吧！"
+    spans = split_sentence(text, criterion="fine", return_offsets=True)
+    assert [text[start:end] for start, end in spans] == split_sentence(text, criterion="fine")
+    assert spans[0][0] == 0 and spans[-1][1] == len(text)
+
+
+def test_split_sentence_long_quoted_passage():
+    text = "开始" + "引用\u201d内容" * 2000
+    assert split_sentence(text, criterion="fine") == [text]
+
+
+def test_split_corpus_jsonl(tmp_path):
+    src = tmp_path / "docs.jsonl"
+    docs = [{"id": "a", "text": "第一句话。第二句话。"}, {"id": "b", "text": "你好！"}, {"text": "无编号。"}]
+    src.write_text("\n".join(json.dumps(d, ensure_ascii=False) for d in docs) + "\n", encoding="utf-8")
+    out = tmp_path / "sentences.jsonl"
+    assert split_corpus(str(src), str(out), workers=2, chunk_size=1) == (3, 4)
+    records = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert [(r["doc_id"], r["sentence_idx"]) for r in records] == [("a", 0), ("a", 1), ("b", 0), (2, 0)]
+    assert records[1]["sentence"] == "第二句话。"
+
+
+def test_split_corpus_directory(tmp_path):
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "one.txt").write_text("第一句。第二句。", encoding="utf-8")
+    (tmp_path / "docs" / "skip.bin").write_text("忽略。", encoding="utf-8")
+    out = tmp_path / "sentences.jsonl"
+    assert split_corpus(str(tmp_path / "docs"), str(out)) == (1, 2)
+    assert json.loads(out.read_text(encoding="utf-8").splitlines()[0])["doc_id"] == "one.txt"
+
+
+def test_sentence_splitter_english_abbreviations():
+    splitter = SentenceSplitter(".!?\n", abbreviations=["Mr.", "e.g."])
+    text = "Mr. Smith went home. He said e.g. this! Really?"
+    assert splitter.split(text) == ["Mr. Smith went home.", " He said e.g. this!", " Really?"]
+    chunks = [text[i:i + 2] for i in range(0, len(text), 2)]
+    assert list(splitter.iter_sentences(chunks)) == splitter.split(text)
+
+
+def test_sentence_splitter_period_needs_space_after():
+    splitter = SentenceSplitter(".!?\n")
+    text = "Pi is 3.14 today. Visit example.com now.Next"
+    assert splitter.split(text) == ["Pi is 3.14 today.", " Visit example.com now.Next"]
+    chunks = [text[i:i + 3] for i in range(0, len(text), 3)]
+    assert list(splitter.iter_sentences(chunks)) == splitter.split(text)
+    assert SentenceSplitter(".", require_space_after="").split("3.14") == ["3.", "14"]
+
+
+def test_sentence_splitter_back_quotes_stay_with_sentence():
+    splitter = SentenceSplitter(".!?")
+    text = "He said \u201chi.\u201d Then left."
+    assert splitter.split(text) == ["He said \u201chi.\u201d", " Then left."]
+    assert list(splitter.iter_sentences(list(text))) == splitter.split(text)
+
+
+def test_sentence_splitter_japanese_split_many():
+    splitter = SentenceSplitter("。！？\n「」", front_quotes="「", back_quotes="」")
+    result = splitter.split_many(["今日は晴れです。明日は雨です！", "彼は「はい。」と言った。"])
+    assert result == [["今日は晴れです。", "明日は雨です！"], ["彼は「はい。」", "と言った。"]]
+
+
+def test_sentence_splitter_matches_default_criteria():
+    text = "他说：\u201c今天天气很好。\u201d我们去公园吧！你好，世界？"
+    splitter = SentenceSplitter("，：。;\u201c\u201d；…！!?？\r\n")
+    assert splitter.split(text) == split_sentence(text, criterion="fine")
+
+
+def _reference_split_sentence(text, criterion):
+    """The original list-based split_sentence algorithm."""
+    if criterion == "coarse":
+        segments = re.split("([。\u201c\u201d！？\n])", text)
+        puncs = {"。", "！", "？", "\n", "\u201c", "\u201d", "\u2018", "\u2019"}
+    else:
+        segments = re.split("([，：。;\u201c\u201d；…！!?？\r\n])", text)
+        puncs = {"……", "\r\n", "，", "。", ";", "；", "…", "！", "!",
+                 "?", "？", "\r", "\n", "\u201c", "\u201d", "\u2018", "\u2019", "："}
+    sentences = []
+    quote_flag = False
+    for seg in segments:
+        if seg == "":
+            continue
+        if seg in puncs:
+            if not sentences:
+                quote_flag = seg in "\u201c\u2018"
+                sentences.append(seg)
+            elif seg in "\u201c\u2018":
+                if sentences[-1][-1] in puncs:
+                    sentences.append(seg)
+                else:
+                    sentences[-1] += seg
+                quote_flag = True
+            else:
+                sentences[-1] += seg
+        elif not sentences:
+            sentences.append(seg)
+        elif quote_flag:
+            sentences[-1] += seg
+            quote_flag = False
+        elif sentences[-1][-1] in "\u201d\u2019" and (len(sentences[-1]) <= 1 or sentences[-1][-2] not in puncs):
+            sentences[-1] += seg
+        elif sentences[-1][-1] in "\u201d\u2019":
+            sentences.append(seg)
+        else:
+            sentences.append(seg)
+    return sentences
+
+
+def test_split_sentence_matches_reference_algorithm():
+    assert split_sentence("书名是\u2018\u2019，作者不详。") == ["书名是\u2018\u2019，作者不详。"]
+    rng = random.Random(0)
+    alphabet = "好a ，：。;；…！!?？\r\n\u201c\u201d\u2018\u2019"
+    for _ in range(5000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 20)))
+        if not text.strip():
+            continue
+        for criterion in ("coarse", "fine"):
+            assert split_sentence(text, criterion) == _reference_split_sentence(text, criterion), text
+
+
+def test_sentence_splitter_rejects_multichar_puncs():
+    with pytest.raises(ValueError):
+        SentenceSplitter(["..."])
+
+
+def test_analyze_text_matches_separate_passes():
+    text = "Hello 你好 World 123！ café ½ \t"
+    tokens, counts = analyze_text(text)
+    assert tokens == word_tokenize(text)
+    assert counts == char_count(text)
+    assert tokens == ["Hello", "你", "好", "World", "123", "caf"]
+
+
+def test_analyze_texts():
+    texts = ["你好", "abc 1", ""]
+    assert analyze_texts(texts) == [analyze_text(t) for t in texts]
+    assert analyze_texts([""])[0] == ([], char_count(""))
+
+
+def test_iter_tokens_offsets():
+    text = "Hello 你好 123"
+    tokens = list(iter_tokens(text))
+    assert [t for t, _, _ in tokens] == word_tokenize(text)
+    assert tokens[1] == ("你", 6, 7)
+
+
+def test_iter_file_tokens_byte_offsets(tmp_path):
+    f = tmp_path / "doc.txt"
+    text = "Hello 你好 world 42！"
+    f.write_text(text, encoding="utf-8")
+    tokens = list(iter_file_tokens(str(f)))
+    assert [t for t, _, _ in tokens] == word_tokenize(text)
+    raw = text.encode("utf-8")
+    assert all(raw[start:end].decode("utf-8") == token for token, start, end in tokens)
+    assert tokens[1] == ("你", 6, 9)
+
+
+def test_iter_file_tokens_empty(tmp_path):
+    f = tmp_path / "empty.txt"
+    f.write_text("")
+    assert list(iter_file_tokens(str(f))) == []
+
+
+_KEYWORD_CORPUS = [
+    "The cat sat on the mat",
+    "The dog ate the cat food",
+    "Python is a programming language",
+    "Cats and dogs are pets",
+]
+
+
+def test_keyword_index_save_load_roundtrip(tmp_path):
+    index = KeywordIndex.build(_KEYWORD_CORPUS)
+    path = index.save(str(tmp_path / "corpus.idx"))
+    loaded = KeywordIndex.load(path)
+    try:
+        assert loaded.n_docs == 4
+        assert len(loaded) == len(index)
+        for term in ("cat", "dog", "python", "pets", "missing"):
+            assert loaded.df(term) == index.df(term)
+            assert loaded.idf(term) == index.idf(term)
+        assert loaded.df("cat") == 2
+    finally:
+        loaded.close()
+
+
+def test_keyword_index_rejects_other_files(tmp_path):
+    path = tmp_path / "bogus.idx"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        KeywordIndex.load(str(path))
+    path.write_bytes(b"DKKW")
+    with pytest.raises(ValueError, match="Not a keyword index"):
+        KeywordIndex.load(str(path))
+
+
+def test_keyword_index_rejects_truncated_files(tmp_path):
+    path = KeywordIndex.build(_KEYWORD_CORPUS).save(str(tmp_path / "corpus.idx"))
+    with open(path, "rb") as f:
+        data = f.read()
+    for size in (30, len(data) - 1):
+        with open(path, "wb") as f:
+            f.write(data[:size])
+        with pytest.raises(ValueError, match="Truncated"):
+            KeywordIndex.load(path)
+
+
+def test_extract_keywords_tfidf_demotes_common_terms():
+    text = "The cat loves python and the cat"
+    plain = extract_keywords(text, lang="en")
+    assert plain[0]["word"] == "cat"
+    index = KeywordIndex.build(["cat " + doc for doc in _KEYWORD_CORPUS])
+    ranked = extract_keywords(text, lang="en", index=index)
+    assert ranked[0] == {"word": "loves", "boost": 2.0}
+    with pytest.raises(ValueError):
+        extract_keywords(text, lang="zh", index=index)
+
+
+def test_extract_keywords_batch_matches_single():
+    pytest.importorskip("jieba")
+    from devkit.text.keywords import extract_keywords_batch
+    texts = ["自然语言处理是人工智能的重要方向", "今天天气很好，我们去公园散步", "Python programming"] * 3
+    expected = [extract_keywords(t, lang="zh", top_k=5) for t in texts]
+    result = list(extract_keywords_batch(texts, lang="zh", top_k=5, workers=2, chunk_size=2))
+    assert result == expected
+
+
+def test_init_jieba_writes_dictionary_cache(tmp_path):
+    pytest.importorskip("jieba")
+    import subprocess
+    cache = tmp_path / "jieba.cache"
+    code = f"from devkit.text.keywords import init_jieba; init_jieba({str(cache)!r})"
+    subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
+    assert cache.stat().st_size > 0
+
+
+def test_write_record_keywords(tmp_path):
+    from devkit.text.keywords import write_record_keywords
+    src = tmp_path / "docs.jsonl"
+    src.write_text('{"id": 1, "text": "python python code"}\n\n{"id": 2}\n', encoding="utf-8")
+    out = tmp_path / "out.jsonl"
+    assert write_record_keywords(str(src), str(out), lang="en", top_k=2) == 2
+    records = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert records[0]["keywords"][0] == {"word": "python", "boost": 2.0}
+    assert records[1] == {"id": 2, "keywords": []}
+
+
+def test_drop_overlapping_matches_pairwise_check():
+    import random
+    from devkit.text.keywords import _drop_overlapping
+    rng = random.Random(0)
+    for _ in range(200):
+        words = list({"".join(rng.choice("abc") for _ in range(rng.randint(1, 5))) for _ in range(30)})
+        ranked = [(w, float(-i)) for i, w in enumerate(words)]
+        top_k = rng.randint(1, 20)
+        expected = []
+        for word, weight in ranked:
+            if len(expected) < top_k and not any(word in k or k in word for k, _ in expected):
+                expected.append((word, weight))
+        assert _drop_overlapping(ranked, top_k) == expected
+
+
+def test_extract_keywords_filter_mode_english():
+    text = "programming program programming code code code"
+    assert [k["word"] for k in extract_keywords(text, lang="en", mode="all")] == ["code", "programming", "program"]
+    assert [k["word"] for k in extract_keywords(text, lang="en", mode="filter")] == ["code", "programming"]
+    with pytest.raises(ValueError):
+        extract_keywords(text, lang="en", mode="overlap")
+
+
+def test_keyword_tracker_matches_exact_window_counts():
+    import random
+    from collections import Counter
+    from devkit.text.keyword_tracker import KeywordTracker
+    rng = random.Random(0)
+    vocab = [f"term{c}" for c in "abcdefghijklmnopqrst"]
+    tracker = KeywordTracker(window=100, slices=4, capacity=10)
+    docs = []
+    for i in range(1000):
+        doc = set(rng.sample(vocab[:5 + i % 15], 3))
+        docs.append(doc)
+        tracker.add_terms(doc)
+    assert tracker.n_docs == 100
+    exact = Counter(term for doc in docs[-100:] for term in doc)
+    assert all(tracker.count(term) == count for term, count in exact.items())
+    top = tracker.top(5)
+    assert [t["count"] for t in top] == sorted(exact.values(), reverse=True)[:5]
+    assert len(tracker._candidates) <= 20
+
+
+def test_keyword_tracker_expires_old_documents():
+    from devkit.text.keyword_tracker import KeywordTracker
+    tracker = KeywordTracker(window=3, slices=3)
+    for text in ["python rocks", "python code", "rust code", "rust rust", "go"]:
+        tracker.add(text)
+    assert tracker.top(2) == [{"word": "rust", "count": 2}, {"word": "code", "count": 1}]
+    assert tracker.count("python") == 0
+    assert tracker.top(10)[-1]["count"] == 1
+    assert "python" not in [t["word"] for t in tracker.top(10)]
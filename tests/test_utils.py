@@ -9,6 +9,7 @@ from devkit.utils import (
     json_loads,
     create_uuid_from_string,
     deduplicate,
+    parallel_map,
 )
 
 
@@ -72,3 +73,12 @@ def test_deduplicate_preserves_order():
 
 def test_deduplicate_empty():
     assert deduplicate([]) == []
+
+
+def test_parallel_map_in_process():
+    assert list(parallel_map(abs, [-1, 2, -3])) == [1, 2, 3]
+
+
+def test_parallel_map_preserves_order_across_workers():
+    items = list(range(-500, 500))
+    assert list(parallel_map(abs, items, workers=2, chunk_size=7)) == [abs(i) for i in items]